@@ -1,17 +1,56 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 import re
+import shlex
+import stat
 import subprocess
-from dataclasses import dataclass
-from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import translate
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+from deepbot import fastjson
+
 logger = logging.getLogger(__name__)
 
+_SHELL_METACHARS = frozenset("|&;<>()$`\\*?[]{}~#!%\n")
+# Shell builtins and reserved words: a command starting with one of these always goes through /bin/sh.
+_SHELL_BUILTINS = frozenset(
+    {
+        ".", ":", "alias", "bg", "break", "builtin", "case", "cd", "command", "continue", "declare",
+        "dirs", "do", "done", "elif", "else", "esac", "eval", "exec", "exit", "export", "fg", "fi",
+        "for", "function", "getopts", "hash", "if", "jobs", "let", "local", "popd", "pushd", "read",
+        "readonly", "return", "select", "set", "shift", "shopt", "source", "then", "time", "times",
+        "trap", "type", "typeset", "ulimit", "umask", "unalias", "unset", "until", "wait", "while",
+    }
+)
+
+_HOOK_WORKERS = 8
+
+# Same leading whitespace as bytes.strip(), which is wider than JSON's own (it adds \v and \f).
+_JSON_OBJECT_START_RE = re.compile(rb"[ \t\n\r\x0b\x0c]*\{")
+
+# Parsed settings keyed by path, reused while (mtime_ns, size) is unchanged.
+_SETTINGS_CACHE: dict[Path, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+
+@lru_cache(maxsize=256)
+def _split_hook_command(command: str) -> tuple[str, ...] | None:
+    """Return argv for commands that can run without a shell, else None."""
+    if any(ch in _SHELL_METACHARS for ch in command):
+        return None
+    try:
+        argv = tuple(shlex.split(command))
+    except ValueError:
+        return None
+    if not argv or "=" in argv[0] or argv[0] in _SHELL_BUILTINS:
+        return None
+    return argv
+
 
 @dataclass(frozen=True)
 class HookDecision:
@@ -52,6 +91,22 @@ class _HookCommand:
 class _HookMatcher:
     matcher: str
     hooks: tuple[_HookCommand, ...]
+    is_wildcard: bool = field(init=False, repr=False, compare=False)
+    glob_re: re.Pattern[str] = field(init=False, repr=False, compare=False)
+    user_re: re.Pattern[str] | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Compile once at load so dispatch does not hit the fnmatch/re caches per tool call.
+        object.__setattr__(self, "is_wildcard", self.matcher == "*")
+        object.__setattr__(self, "glob_re", re.compile(translate(self.matcher)))
+        try:
+            user_re: re.Pattern[str] | None = re.compile(self.matcher)
+        except re.error:
+            user_re = None
+        object.__setattr__(self, "user_re", user_re)
+
+
+_EMPTY_RESULT = HookRunResult(blocked=False, user_message="", model_message="")
 
 
 class ClaudeHooksManager:
@@ -69,6 +124,15 @@ class ClaudeHooksManager:
         "SessionEnd",
     }
 
+    _TOOL_GATED_EVENTS = frozenset({"PreToolUse", "PostToolUse"})
+    _STDOUT_CONTEXT_EVENTS = frozenset({"UserPromptSubmit", "SessionStart"})
+
+    # Constant payload fields per event, merged after the common envelope keys.
+    _EVENT_PAYLOAD_DEFAULTS: dict[str, dict[str, Any]] = {
+        "SessionStart": {"source": "startup"},
+        "Stop": {"stop_hook_active": True},
+    }
+
     _TOOL_NAME_MAP = {
         "shell": "Bash",
         "file_read": "Read",
@@ -90,6 +154,14 @@ class ClaudeHooksManager:
         self._fail_mode = fail_mode
         self._settings_files = settings_files
         self._seen_sessions: set[str] = set()
+        self._matcher_index: dict[tuple[str, str], tuple[_HookMatcher, ...]] = {}
+        self._env_by_event: dict[str, dict[str, str]] = {}
+        # The environment is read once at startup; nothing reloads it while the bot runs.
+        self._base_env: dict[str, str] = dict(os.environ)
+        # Created up front: events are dispatched from several threads, and workers start lazily anyway.
+        self._executor = ThreadPoolExecutor(max_workers=_HOOK_WORKERS, thread_name_prefix="deepbot-hook")
+        self._cwd: str | None = None
+        self._payload_templates: dict[str, dict[str, Any]] = {}
 
     @classmethod
     def from_settings_paths(
@@ -102,14 +174,18 @@ class ClaudeHooksManager:
     ) -> "ClaudeHooksManager":
         resolved_paths = cls._resolve_settings_paths(paths, cwd=cwd)
         matchers_by_event: dict[str, list[_HookMatcher]] = {}
+        settings_files: list[str] = []
 
         for path in resolved_paths:
-            if not path.exists() or not path.is_file():
-                continue
             try:
-                raw = json.loads(path.read_text(encoding="utf-8"))
-            except Exception as exc:
-                logger.warning("Failed to parse hooks settings file: %s (%s)", path, exc)
+                st = path.stat()
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            settings_files.append(str(path))
+            raw = cls._load_settings_file(path, st)
+            if raw is None:
                 continue
             hooks_root = raw.get("hooks")
             if not isinstance(hooks_root, dict):
@@ -131,9 +207,25 @@ class ClaudeHooksManager:
             matchers_by_event=frozen,
             timeout_ms=timeout_ms,
             fail_mode=fail_mode,
-            settings_files=tuple(str(p) for p in resolved_paths if p.exists() and p.is_file()),
+            settings_files=tuple(settings_files),
         )
 
+    @staticmethod
+    def _load_settings_file(path: Path, st: os.stat_result) -> dict[str, Any] | None:
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = _SETTINGS_CACHE.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            raw = fastjson.loads(path.read_bytes())
+        except Exception as exc:
+            logger.warning("Failed to parse hooks settings file: %s (%s)", path, exc)
+            return None
+        if not isinstance(raw, dict):
+            return None
+        _SETTINGS_CACHE[path] = (signature, raw)
+        return raw
+
     @staticmethod
     def _resolve_settings_paths(paths: tuple[str, ...], *, cwd: Path | None = None) -> tuple[Path, ...]:
         root = cwd or Path.cwd()
@@ -161,7 +253,7 @@ class ClaudeHooksManager:
             matcher = "*"
             hooks_payload: Any = None
 
-            if event_name in {"PreToolUse", "PostToolUse"}:
+            if event_name in cls._TOOL_GATED_EVENTS:
                 matcher = str(entry.get("matcher", "*") or "*")
                 hooks_payload = entry.get("hooks")
             else:
@@ -199,39 +291,37 @@ class ClaudeHooksManager:
     def has_any_hooks(self) -> bool:
         return any(self._matchers_by_event.values())
 
+    def _cached_cwd(self) -> str:
+        # The bot never changes its working directory after startup, so the first value holds
+        # for the manager's lifetime and is baked into the cached payload templates.
+        if self._cwd is None:
+            self._cwd = str(Path.cwd())
+        return self._cwd
+
+    def _env_for(self, event_name: str) -> dict[str, str]:
+        env = self._env_by_event.get(event_name)
+        if env is None:
+            env = {**self._base_env, "CLAUDE_HOOK_EVENT_NAME": event_name}
+            self._env_by_event[event_name] = env
+        return env
+
     def dispatch_session_start(self, *, session_id: str, prompt: str) -> HookRunResult:
         if session_id in self._seen_sessions:
-            return HookRunResult(blocked=False, user_message="", model_message="")
+            return _EMPTY_RESULT
         self._seen_sessions.add(session_id)
-        payload = {
-            "session_id": session_id,
-            "cwd": str(Path.cwd()),
-            "hook_event_name": "SessionStart",
-            "source": "startup",
-            "prompt": prompt,
-        }
-        return self._dispatch_event("SessionStart", payload=payload)
+        return self._dispatch_event("SessionStart", session_id=session_id, fields={"prompt": prompt})
 
     def dispatch_user_prompt_submit(self, *, session_id: str, prompt: str) -> HookRunResult:
-        payload = {
-            "session_id": session_id,
-            "cwd": str(Path.cwd()),
-            "hook_event_name": "UserPromptSubmit",
-            "prompt": prompt,
-        }
-        return self._dispatch_event("UserPromptSubmit", payload=payload)
+        return self._dispatch_event("UserPromptSubmit", session_id=session_id, fields={"prompt": prompt})
 
     def dispatch_pre_tool_use(self, *, session_id: str, tool_name: str, tool_input: Any) -> HookRunResult:
         mapped = self._TOOL_NAME_MAP.get(tool_name, tool_name)
-        payload = {
-            "session_id": session_id,
-            "cwd": str(Path.cwd()),
-            "hook_event_name": "PreToolUse",
+        fields = {
             "tool_name": mapped,
             "tool_original_name": tool_name,
             "tool_input": tool_input,
         }
-        return self._dispatch_event("PreToolUse", payload=payload, matcher_target=mapped)
+        return self._dispatch_event("PreToolUse", session_id=session_id, fields=fields, matcher_target=mapped)
 
     def dispatch_post_tool_use(
         self,
@@ -242,109 +332,140 @@ class ClaudeHooksManager:
         tool_response: Any,
     ) -> HookRunResult:
         mapped = self._TOOL_NAME_MAP.get(tool_name, tool_name)
-        payload = {
-            "session_id": session_id,
-            "cwd": str(Path.cwd()),
-            "hook_event_name": "PostToolUse",
+        fields = {
             "tool_name": mapped,
             "tool_original_name": tool_name,
             "tool_input": tool_input,
             "tool_response": tool_response,
         }
-        return self._dispatch_event("PostToolUse", payload=payload, matcher_target=mapped)
+        return self._dispatch_event("PostToolUse", session_id=session_id, fields=fields, matcher_target=mapped)
 
     def dispatch_stop(self, *, session_id: str, response_text: str) -> HookRunResult:
-        payload = {
-            "session_id": session_id,
-            "cwd": str(Path.cwd()),
-            "hook_event_name": "Stop",
-            "stop_hook_active": True,
-            "response": response_text,
-        }
-        return self._dispatch_event("Stop", payload=payload)
+        return self._dispatch_event("Stop", session_id=session_id, fields={"response": response_text})
+
+    def _payload_template(self, event_name: str) -> dict[str, Any]:
+        template = self._payload_templates.get(event_name)
+        if template is None:
+            template = {
+                "session_id": "",
+                "cwd": self._cached_cwd(),
+                "hook_event_name": event_name,
+                **self._EVENT_PAYLOAD_DEFAULTS.get(event_name, {}),
+            }
+            self._payload_templates[event_name] = template
+        return template
 
     def _dispatch_event(
         self,
         event_name: str,
         *,
-        payload: dict[str, Any],
+        session_id: str,
+        fields: dict[str, Any],
         matcher_target: str = "*",
     ) -> HookRunResult:
-        matchers = self._matchers_by_event.get(event_name, ())
+        matchers = self._matchers_for(event_name, matcher_target)
         if not matchers:
-            return HookRunResult(blocked=False, user_message="", model_message="")
+            return _EMPTY_RESULT
+
+        # Build and serialize the payload only when a hook will actually run, once per event.
+        payload = self._payload_template(event_name) | {"session_id": session_id, **fields}
+        commands = [hook.command for matcher in matchers for hook in matcher.hooks]
+        try:
+            stdin_bytes = fastjson.dumps(payload)
+        except (TypeError, ValueError) as exc:
+            executions = [self._failed_execution(event_name, command, f"Hook failed: {exc}") for command in commands]
+        else:
+            executions = self._run_commands(event_name=event_name, commands=commands, stdin_bytes=stdin_bytes)
 
         blocked = False
         user_messages: list[str] = []
         model_messages: list[str] = []
         context_chunks: list[str] = []
 
-        for matcher in matchers:
-            if event_name in {"PreToolUse", "PostToolUse"} and not self._matches(matcher.matcher, matcher_target):
-                continue
-            for hook in matcher.hooks:
-                execution = self._run_command(
-                    event_name=event_name,
-                    command=hook.command,
-                    payload=payload,
-                )
-                decision = execution.json_decision
+        for execution in executions:
+            decision = execution.json_decision
 
-                if execution.stdout and event_name in {"UserPromptSubmit", "SessionStart"}:
-                    context_chunks.append(execution.stdout)
+            if execution.stdout and event_name in self._STDOUT_CONTEXT_EVENTS:
+                context_chunks.append(execution.stdout)
 
-                if decision is not None and decision.additional_context:
-                    context_chunks.append(decision.additional_context)
+            if decision is not None and decision.additional_context:
+                context_chunks.append(decision.additional_context)
 
-                local_blocked, user_msg, model_msg = self._evaluate_outcome(
-                    event_name=event_name,
-                    execution=execution,
-                )
-                if user_msg:
-                    user_messages.append(user_msg)
-                if model_msg:
-                    model_messages.append(model_msg)
-                if local_blocked:
-                    blocked = True
+            local_blocked, user_msg, model_msg = self._evaluate_outcome(
+                event_name=event_name,
+                execution=execution,
+            )
+            if user_msg:
+                user_messages.append(user_msg)
+            if model_msg:
+                model_messages.append(model_msg)
+            if local_blocked:
+                blocked = True
 
         return HookRunResult(
             blocked=blocked,
-            user_message="\n".join(part for part in user_messages if part).strip(),
-            model_message="\n".join(part for part in model_messages if part).strip(),
-            additional_context="\n".join(part for part in context_chunks if part).strip(),
+            # Every collected part is already stripped and non-empty.
+            user_message="\n".join(user_messages),
+            model_message="\n".join(model_messages),
+            additional_context="\n".join(context_chunks),
         )
 
+    def _run_commands(
+        self,
+        *,
+        event_name: str,
+        commands: list[str],
+        stdin_bytes: bytes,
+    ) -> list[HookExecution]:
+        if len(commands) == 1:
+            return [self._run_command(event_name=event_name, command=commands[0], stdin_bytes=stdin_bytes)]
+        # Hooks are independent processes, each bounded by the hook timeout. They run _HOOK_WORKERS at a
+        # time, so an event with n matched commands can take up to ceil(n / _HOOK_WORKERS) timeouts.
+        futures = [
+            self._executor.submit(self._run_command, event_name=event_name, command=command, stdin_bytes=stdin_bytes)
+            for command in commands
+        ]
+        return [future.result() for future in futures]
+
+    def _matchers_for(self, event_name: str, matcher_target: str) -> tuple[_HookMatcher, ...]:
+        matchers = self._matchers_by_event.get(event_name, ())
+        if not matchers or event_name not in self._TOOL_GATED_EVENTS:
+            return matchers
+        # Tool names form a small closed set, so memoize the filtered matchers per tool
+        # while keeping settings-file order.
+        key = (event_name, matcher_target)
+        cached = self._matcher_index.get(key)
+        if cached is None:
+            cached = tuple(m for m in matchers if self._matches(m, matcher_target))
+            self._matcher_index[key] = cached
+        return cached
+
     @staticmethod
-    def _matches(matcher: str, target: str) -> bool:
-        if matcher == "*":
+    def _matches(matcher: _HookMatcher, target: str) -> bool:
+        if matcher.is_wildcard:
             return True
-        if fnmatchcase(target, matcher):
+        if matcher.glob_re.match(target):
             return True
-        try:
-            if re.search(matcher, target):
-                return True
-        except re.error:
-            return target == matcher
-        return False
+        if matcher.user_re is None:
+            return target == matcher.matcher
+        return matcher.user_re.search(target) is not None
 
-    def _run_command(self, *, event_name: str, command: str, payload: dict[str, Any]) -> HookExecution:
-        stdin_text = json.dumps(payload, ensure_ascii=False)
-        env = dict(os.environ)
-        env["CLAUDE_HOOK_EVENT_NAME"] = event_name
+    def _run_command(self, *, event_name: str, command: str, stdin_bytes: bytes) -> HookExecution:
+        env = self._env_for(event_name)
+        argv = _split_hook_command(command)
         try:
-            completed = subprocess.run(
-                command,
-                input=stdin_text,
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=self._timeout_seconds,
-                env=env,
-                check=False,
-            )
-            stdout = (completed.stdout or "").strip()
-            stderr = (completed.stderr or "").strip()
-            decision = self._parse_json_decision(stdout)
+            try:
+                completed = self._spawn(command if argv is None else argv, stdin_bytes=stdin_bytes, env=env)
+            except OSError:
+                if argv is None:
+                    raise
+                # Direct exec fails on missing programs, scripts without a shebang (ENOEXEC) and files
+                # without the execute bit (EACCES); /bin/sh decides between running them, 126 and 127.
+                completed = self._spawn(command, stdin_bytes=stdin_bytes, env=env)
+            raw_stdout = completed.stdout or b""
+            decision = self._parse_json_decision(raw_stdout)
+            stdout = raw_stdout.decode("utf-8", "replace").strip()
+            stderr = (completed.stderr or b"").decode("utf-8", "replace").strip()
             return HookExecution(
                 event_name=event_name,
                 command=command,
@@ -354,54 +475,51 @@ class ClaudeHooksManager:
                 json_decision=decision,
             )
         except subprocess.TimeoutExpired:
-            msg = f"Hook timed out after {self._timeout_seconds:.3f}s"
-            if self._fail_mode == "closed":
-                return HookExecution(
-                    event_name=event_name,
-                    command=command,
-                    exit_code=2,
-                    stdout="",
-                    stderr=msg,
-                    json_decision=None,
-                )
-            return HookExecution(
-                event_name=event_name,
-                command=command,
-                exit_code=1,
-                stdout="",
-                stderr=msg,
-                json_decision=None,
+            return self._failed_execution(
+                event_name,
+                command,
+                f"Hook timed out after {self._timeout_seconds:.3f}s",
             )
         except Exception as exc:
-            msg = f"Hook failed: {exc}"
-            if self._fail_mode == "closed":
-                return HookExecution(
-                    event_name=event_name,
-                    command=command,
-                    exit_code=2,
-                    stdout="",
-                    stderr=msg,
-                    json_decision=None,
-                )
-            return HookExecution(
-                event_name=event_name,
-                command=command,
-                exit_code=1,
-                stdout="",
-                stderr=msg,
-                json_decision=None,
-            )
+            return self._failed_execution(event_name, command, f"Hook failed: {exc}")
+
+    def _spawn(
+        self,
+        args: str | tuple[str, ...],
+        *,
+        stdin_bytes: bytes,
+        env: dict[str, str],
+    ) -> subprocess.CompletedProcess[bytes]:
+        # A plain string is a shell command line; a tuple is argv for a direct exec.
+        return subprocess.run(
+            args,
+            input=stdin_bytes,
+            capture_output=True,
+            shell=isinstance(args, str),
+            timeout=self._timeout_seconds,
+            env=env,
+            check=False,
+        )
+
+    def _failed_execution(self, event_name: str, command: str, message: str) -> HookExecution:
+        return HookExecution(
+            event_name=event_name,
+            command=command,
+            exit_code=2 if self._fail_mode == "closed" else 1,
+            stdout="",
+            stderr=message,
+            json_decision=None,
+        )
 
     @staticmethod
-    def _parse_json_decision(stdout: str) -> HookDecision | None:
-        if not stdout:
-            return None
-        text = stdout.strip()
-        if not text.startswith("{"):
+    def _parse_json_decision(stdout: bytes) -> HookDecision | None:
+        # Most hooks print plain text; bail out before copying or parsing the buffer.
+        if not stdout or _JSON_OBJECT_START_RE.match(stdout) is None:
             return None
         try:
-            payload = json.loads(text)
-        except json.JSONDecodeError:
+            payload = fastjson.loads(stdout.strip())
+        except ValueError:
+            # Covers malformed JSON and non-UTF-8 output (UnicodeDecodeError) alike.
             return None
         if not isinstance(payload, dict):
             return None
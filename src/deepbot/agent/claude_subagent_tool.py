@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-import json
 import subprocess
 from dataclasses import dataclass
 from typing import Any, Callable
-from urllib import error as urlerror
-from urllib import request as urlrequest
 
-from deepbot.config import ConfigError
+import urllib3
+
+from deepbot import fastjson
+from deepbot.agent.strands_tool import get_strands_tool
+
+
+# Shared keep-alive pool so repeated sidecar calls skip TCP/TLS setup.
+_SIDECAR_POOL = urllib3.PoolManager(maxsize=4, retries=False)
 
 
 @dataclass(frozen=True)
@@ -50,7 +54,6 @@ def _run_via_direct(
         completed = subprocess.run(
             args,
             cwd=settings.workdir,
-            text=True,
             capture_output=True,
             timeout=settings.timeout_seconds,
             check=False,
@@ -64,17 +67,20 @@ def _run_via_direct(
             f"claude_subagent timed out after {settings.timeout_seconds}s"
         ) from exc
 
-    stderr = (completed.stderr or "").strip()
-    stdout = (completed.stdout or "").strip()
+    raw_stdout = completed.stdout or b""
     if completed.returncode != 0:
+        stderr = (completed.stderr or b"").decode("utf-8", errors="replace").strip()
+        stdout = raw_stdout.decode("utf-8", errors="replace").strip()
         detail = stderr or stdout or "unknown error"
         raise RuntimeError(
             f"claude_subagent failed with exit code {completed.returncode}: {detail}"
         )
 
+    # Parse the captured bytes directly; decoding is only needed for error messages.
     try:
-        return json.loads(stdout)
-    except json.JSONDecodeError as exc:
+        return fastjson.loads(raw_stdout)
+    except fastjson.JSONDecodeError as exc:
+        stdout = raw_stdout.decode("utf-8", errors="replace").strip()
         raise RuntimeError(f"claude_subagent returned non-JSON output: {stdout[:4000]}") from exc
 
 
@@ -90,35 +96,43 @@ def _run_via_sidecar(
         "model": settings.model or "",
         "skip_permissions": settings.skip_permissions,
     }
-    data = json.dumps(body).encode("utf-8")
+    data = fastjson.dumps(body)
     headers = {"Content-Type": "application/json"}
     if settings.sidecar_token:
         headers["Authorization"] = f"Bearer {settings.sidecar_token}"
-    req = urlrequest.Request(settings.sidecar_url, data=data, headers=headers, method="POST")
     try:
-        with urlrequest.urlopen(req, timeout=settings.timeout_seconds + 5) as resp:
-            raw = resp.read().decode("utf-8")
-    except urlerror.HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
+        resp = _SIDECAR_POOL.request(
+            "POST",
+            settings.sidecar_url,
+            body=data,
+            headers=headers,
+            timeout=settings.timeout_seconds + 5,
+        )
+    except urllib3.exceptions.TimeoutError as exc:
         raise RuntimeError(
-            f"claude_subagent sidecar HTTP {exc.code}: {detail[:1000]}"
+            f"claude_subagent sidecar timed out after {settings.timeout_seconds + 5}s"
         ) from exc
-    except urlerror.URLError as exc:
-        raise RuntimeError(f"claude_subagent sidecar unreachable: {exc.reason}") from exc
+    except urllib3.exceptions.HTTPError as exc:
+        raise RuntimeError(f"claude_subagent sidecar unreachable: {exc}") from exc
+
+    raw = resp.data
+    if resp.status >= 400:
+        detail = raw.decode("utf-8", errors="replace")
+        raise RuntimeError(
+            f"claude_subagent sidecar HTTP {resp.status}: {detail[:1000]}"
+        )
 
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError as exc:
+        return fastjson.loads(raw)
+    except fastjson.JSONDecodeError as exc:
+        text = raw.decode("utf-8", errors="replace")
         raise RuntimeError(
-            f"claude_subagent sidecar returned non-JSON output: {raw[:4000]}"
+            f"claude_subagent sidecar returned non-JSON output: {text[:4000]}"
         ) from exc
 
 
 def build_claude_subagent_tool(settings: ClaudeSubagentSettings) -> Callable[..., Any]:
-    try:
-        from strands import tool
-    except Exception as exc:  # pragma: no cover
-        raise ConfigError(f"Failed to load strands tool decorator for claude_subagent: {exc}") from exc
+    tool = get_strands_tool()
 
     @tool
     def claude_subagent(task: str, resume_session_id: str | None = None) -> dict[str, Any]:
@@ -160,7 +174,7 @@ def build_claude_subagent_tool(settings: ClaudeSubagentSettings) -> Callable[...
         }
         return {
             "status": "success",
-            "content": [{"text": json.dumps(result, ensure_ascii=False)}],
+            "content": [{"text": fastjson.dumps_str(result)}],
         }
 
     return claude_subagent
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Callable
+
+from deepbot.config import ConfigError
+
+
+@lru_cache(maxsize=1)
+def get_strands_tool() -> Callable[..., Any]:
+    # Resolved once for every tool factory; strands stays out of module import time.
+    try:
+        from strands import tool
+    except Exception as exc:  # pragma: no cover
+        raise ConfigError(f"Failed to load strands tool decorator: {exc}") from exc
+    return tool
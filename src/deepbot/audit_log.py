@@ -1,19 +1,50 @@
 from __future__ import annotations
 
-import json
+import logging
 import os
+import queue
 import re
 import threading
 import time
 import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from deepbot import fastjson
+
+logger = logging.getLogger(__name__)
+
+# Lines per writev call; well below IOV_MAX (1024 on Linux).
+_WRITE_BATCH_MAX = 256
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") for the most recent timestamp; replaced as one tuple so
+# concurrent callers at worst recompute it.
+_iso_second_cache: tuple[int, str] = (-1, "")
 
 
 def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    global _iso_second_cache
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached_seconds, prefix = _iso_second_cache
+    if cached_seconds != seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _iso_second_cache = (seconds, prefix)
+    return f"{prefix}.{nanos // 1_000_000:03d}Z"
+
+
+@lru_cache(maxsize=16)
+def _record_type_infix(record_type: str) -> bytes:
+    # Everything between the timestamp and the payload is fixed for a given record type.
+    return b'","type":' + fastjson.dumps(record_type) + b',"payload":'
+
+
+@lru_cache(maxsize=64)
+def _bare_event_payload(event: str, session_id: str) -> bytes:
+    return fastjson.dumps({"event": event, "session_id": session_id})
 
 
 def _resolve_transcript_root() -> Path:
@@ -28,6 +59,19 @@ def transcripts_enabled() -> bool:
     return raw not in {"0", "false", "no", "off"}
 
 
+class _TurnBuffer:
+    __slots__ = ("owner", "lines", "open")
+
+    def __init__(self, owner: AuditLogger) -> None:
+        self.owner = owner
+        self.lines: list[bytes] = []
+        self.open = True
+
+
+# Module level as the contextvars docs advise; each buffer records which logger it belongs to.
+_TURN_BUFFER: ContextVar[_TurnBuffer | None] = ContextVar("audit_turn_buffer", default=None)
+
+
 @dataclass(frozen=True)
 class AuditSession:
     session_id: str
@@ -35,7 +79,13 @@ class AuditSession:
 
 
 class AuditLogger:
-    """Codex-style JSONL audit logger with best-effort writes."""
+    """Codex-style JSONL audit logger with best-effort writes.
+
+    Records are serialized on the caller and appended by a background writer thread,
+    so message handlers never wait on disk I/O. Call ``flush`` to wait for queued
+    records and ``close`` on shutdown. Records written inside ``turn()`` are handed to
+    the writer together when the turn ends.
+    """
     _REDACTED = "[REDACTED]"
     _SENSITIVE_KEY_TOKENS = (
         "token",
@@ -47,17 +97,30 @@ class AuditLogger:
         "authorization",
         "auth",
     )
+    _SENSITIVE_KEY_RE = re.compile("|".join(map(re.escape, _SENSITIVE_KEY_TOKENS)))
     _AUTH_COMMAND_RE = re.compile(r"(?i)(^|\s)(/auth)\s+\S+")
     _KV_SECRET_RE = re.compile(
         r"(?i)\b(api[_-]?key|token|passphrase|password|secret|authorization)\b\s*[:=]\s*([^\s,;]+)"
     )
     _BEARER_RE = re.compile(r"(?i)\bBearer\s+[A-Za-z0-9._\-]+")
+    # Prefixes of the three patterns above in one alternation: any text they would rewrite
+    # matches here, so the common secret-free message costs a single scan.
+    _SECRET_HINT_RE = re.compile(
+        r"(?i)(?:^|\s)/auth\s+\S"
+        r"|\b(?:api[_-]?key|token|passphrase|password|secret|authorization)\b\s*[:=]\s*[^\s,;]"
+        r"|\bBearer\s+[A-Za-z0-9._\-]"
+    )
 
     def __init__(self, path: Path, *, originator: str = "deepbot") -> None:
         self._path = path
         self._originator = originator
         self._lock = threading.Lock()
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        self._queue: queue.Queue[bytes | None] = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="audit-log-writer", daemon=True)
+        self._writer.start()
         self.session_id = uuid.uuid4().hex
         self._write(
             "session_meta",
@@ -73,16 +136,88 @@ class AuditLogger:
     def path(self) -> Path:
         return self._path
 
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    @contextmanager
+    def turn(self) -> Iterator[None]:
+        """Buffer this task's records and enqueue them as one write when the block exits."""
+        current = _TURN_BUFFER.get()
+        if current is not None and current.owner is self:
+            yield
+            return
+        buffer = _TurnBuffer(self)
+        token = _TURN_BUFFER.set(buffer)
+        try:
+            yield
+        finally:
+            _TURN_BUFFER.reset(token)
+            with self._lock:
+                # Tasks spawned inside the turn share the buffer; later writes from them go
+                # straight to the queue.
+                buffer.open = False
+                if buffer.lines and not self._closed:
+                    self._queue.put_nowait(b"".join(buffer.lines))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join(timeout=5.0)
+        if self._writer.is_alive():
+            logger.warning("Audit log writer did not stop in time. path=%s", self._path)
+            return
+        os.close(self._fd)
+
     def _write(self, record_type: str, payload: dict[str, Any]) -> None:
-        event = {
-            "timestamp": _now_iso(),
-            "type": record_type,
-            "payload": payload,
-        }
-        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        self._write_payload_bytes(record_type, fastjson.dumps(payload))
+
+    def _write_payload_bytes(self, record_type: str, payload: bytes) -> None:
+        # Same bytes as dumping {"timestamp", "type", "payload"}; only the payload is serialized.
+        line = b'{"timestamp":"' + _now_iso().encode("ascii") + _record_type_infix(record_type) + payload + b"}\n"
+        buffer = _TURN_BUFFER.get()
         with self._lock:
-            with self._path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            if self._closed:
+                raise RuntimeError("Audit logger is closed")
+            if buffer is not None and buffer.owner is self and buffer.open:
+                buffer.lines.append(line)
+                return
+            self._queue.put_nowait(line)
+
+    def _run_writer(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                self._write_all([line for line in batch if line is not None])
+            except Exception:
+                logger.warning("Failed to write audit log records. path=%s", self._path, exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_all(self, lines: list[bytes]) -> None:
+        if not lines:
+            return
+        written = os.writev(self._fd, lines)
+        total = sum(map(len, lines))
+        if written == total:
+            return
+        # Short writes are rare on regular files; finish the remainder with plain writes.
+        view = memoryview(b"".join(lines))[written:]
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
 
     def safe_write(self, record_type: str, payload: dict[str, Any]) -> None:
         try:
@@ -91,6 +226,12 @@ class AuditLogger:
             # Logging must never break the bot runtime path.
             return
 
+    def safe_write_bytes(self, record_type: str, payload: bytes) -> None:
+        try:
+            self._write_payload_bytes(record_type, payload)
+        except Exception:
+            return
+
     def log_user_message(
         self,
         *,
@@ -144,20 +285,31 @@ class AuditLogger:
         )
 
     def log_event(self, *, event: str, session_id: str, data: dict[str, Any] | None = None) -> None:
+        if not data:
+            # Most events carry no data; reuse the rendered payload for repeated (event, session) pairs.
+            self.safe_write_bytes("event", _bare_event_payload(event, session_id))
+            return
         payload: dict[str, Any] = {"event": event, "session_id": session_id}
-        if data:
-            payload.update(data)
+        payload.update(data)
         self.safe_write("event", payload)
 
     @classmethod
     def _is_sensitive_key(cls, key: str) -> bool:
-        lowered = key.strip().lower()
-        return any(token in lowered for token in cls._SENSITIVE_KEY_TOKENS)
+        return cls._SENSITIVE_KEY_RE.search(key.lower()) is not None
+
+    @classmethod
+    def _may_contain_secret(cls, text: str) -> bool:
+        # Every redaction needs "/auth", a ":"/"=" separator or "Bearer". Substring checks run at
+        # memchr speed, far cheaper than the regex scan for ordinary chat text.
+        if "/" not in text and ":" not in text and "=" not in text and "bearer" not in text.lower():
+            return False
+        return cls._SECRET_HINT_RE.search(text) is not None
 
     @classmethod
     def _sanitize_text(cls, text: str) -> str:
-        if not text:
+        if not text or not cls._may_contain_secret(text):
             return text
+        # Overlapping matches (e.g. "Bearer token=...") depend on this order, so keep separate passes.
         redacted = cls._AUTH_COMMAND_RE.sub(r"\1\2 " + cls._REDACTED, text)
         redacted = cls._KV_SECRET_RE.sub(lambda m: f"{m.group(1)}={cls._REDACTED}", redacted)
         redacted = cls._BEARER_RE.sub("Bearer " + cls._REDACTED, redacted)
@@ -165,22 +317,47 @@ class AuditLogger:
 
     @classmethod
     def _sanitize_value(cls, value: Any) -> Any:
-        if isinstance(value, dict):
-            masked: dict[str, Any] = {}
-            for k, v in value.items():
-                key = str(k)
-                if cls._is_sensitive_key(key):
-                    masked[key] = cls._REDACTED
-                else:
-                    masked[key] = cls._sanitize_value(v)
-            return masked
-        if isinstance(value, list):
-            return [cls._sanitize_value(item) for item in value]
-        if isinstance(value, tuple):
-            return [cls._sanitize_value(item) for item in value]
-        if isinstance(value, str):
-            return cls._sanitize_text(value)
-        return value
+        # Walk with an explicit stack so deeply nested tool output cannot hit the recursion limit.
+        # Each entry is (parent, slot, value): the sanitized value is stored at parent[slot].
+        # An entry with parent None marks the end of a container's subtree and removes it from the path.
+        root: list[Any] = [None]
+        stack: list[tuple[Any, Any, Any]] = [(root, 0, value)]
+        on_path: set[int] = set()
+        while stack:
+            parent, slot, item = stack.pop()
+            if parent is None:
+                on_path.discard(item)
+                continue
+            kind = _sanitize_kind(item)
+            if kind is dict or kind is list:
+                item_id = id(item)
+                if item_id in on_path:
+                    parent[slot] = _CYCLE_PLACEHOLDER
+                    continue
+                on_path.add(item_id)
+                stack.append((None, None, item_id))
+            if kind is dict:
+                masked: dict[str, Any] = {}
+                parent[slot] = masked
+                pending: list[tuple[Any, Any, Any]] = []
+                for k, v in item.items():
+                    key = str(k)
+                    if cls._is_sensitive_key(key):
+                        masked[key] = cls._REDACTED
+                    else:
+                        masked[key] = None
+                        pending.append((masked, key, v))
+                # Reversed so that, as before, the last of several keys with the same str() wins.
+                stack.extend(reversed(pending))
+            elif kind is list:
+                items: list[Any] = [None] * len(item)
+                parent[slot] = items
+                stack.extend((items, index, v) for index, v in enumerate(item))
+            elif kind is str:
+                parent[slot] = cls._sanitize_text(item)
+            else:
+                parent[slot] = item
+        return root[0]
 
     @classmethod
     def _json_text(cls, value: Any) -> str:
@@ -188,7 +365,7 @@ class AuditLogger:
         if isinstance(sanitized, str):
             return sanitized
         try:
-            return json.dumps(sanitized, ensure_ascii=False, separators=(",", ":"))
+            return fastjson.dumps_str(sanitized)
         except Exception:
             return str(sanitized)
 
@@ -234,19 +411,30 @@ class AuditLogger:
         self.safe_write("response_item", payload)
 
 
+_CYCLE_PLACEHOLDER = "<cycle>"
+_SANITIZE_KINDS: dict[type, type] = {dict: dict, list: list, tuple: list, str: str}
+
+
+def _sanitize_kind(value: Any) -> type | None:
+    kind = _SANITIZE_KINDS.get(type(value))
+    if kind is not None:
+        return kind
+    # Subclasses (OrderedDict, str enums, ...) miss the exact-type table.
+    if isinstance(value, dict):
+        return dict
+    if isinstance(value, (list, tuple)):
+        return list
+    if isinstance(value, str):
+        return str
+    return None
+
+
 def create_audit_logger() -> AuditLogger | None:
     if not transcripts_enabled():
         return None
     now = datetime.now(timezone.utc)
-    sessions_dir = (
-        _resolve_transcript_root()
-        / "sessions"
-        / now.strftime("%Y")
-        / now.strftime("%m")
-        / now.strftime("%d")
-    )
-    suffix = uuid.uuid4().hex
-    filename = f"rollout-{now.strftime('%Y-%m-%dT%H-%M-%S')}-{suffix}.jsonl"
+    sessions_dir = _resolve_transcript_root() / f"sessions/{now:%Y/%m/%d}"
+    filename = f"rollout-{now:%Y-%m-%dT%H-%M-%S}-{uuid.uuid4().hex}.jsonl"
     try:
         return AuditLogger(sessions_dir / filename)
     except Exception:
@@ -1,22 +1,21 @@
 from __future__ import annotations
 
-import json
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-import dotenv
+from deepbot import fastjson
 
-
-dotenv.load_dotenv(override=True)
+_SUPPORTED_DANGEROUS_TOOLS = frozenset(("file_read", "file_write", "editor", "environment", "shell"))
 
 
 class ConfigError(ValueError):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AppConfig:
     discord_bot_token: str
     strands_model_provider: str
@@ -33,6 +32,9 @@ class AppConfig:
     auto_thread_archive_minutes: int
     auto_thread_rename_from_reply: bool
     agent_timeout_seconds: int
+    agent_max_concurrent_invocations: int
+    response_cache_ttl_seconds: int
+    response_cache_similarity: float
     bot_fallback_message: str
     bot_processing_message: str
     log_level: str
@@ -92,11 +94,14 @@ class AppConfig:
     security_disk_percent_threshold: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RuntimeSettings:
     max_messages: int
     ttl_seconds: int
     timeout_seconds: int
+    max_concurrent_invocations: int = 1
+    response_cache_ttl_seconds: int = 0
+    response_cache_similarity: float = 0.9
 
 
 def _parse_bool(value: str | None, *, default: bool) -> bool:
@@ -105,18 +110,59 @@ def _parse_bool(value: str | None, *, default: bool) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+@lru_cache(maxsize=1)
+def _load_dotenv_once() -> None:
+    # Containers receive their settings as real environment variables; let them skip the .env search.
+    if _parse_bool(os.environ.get("DEEPBOT_SKIP_DOTENV"), default=False):
+        return
+    import dotenv
+
+    dotenv.load_dotenv(override=True)
+
+
+def _parse_positive_int(name: str, default: str) -> int:
+    raw = os.environ.get(name, default)
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ConfigError(f"{name} must be an integer") from exc
+    if value <= 0:
+        raise ConfigError(f"{name} must be > 0")
+    return value
+
+
+def _parse_non_negative_int(name: str, default: str) -> int:
+    raw = os.environ.get(name, default)
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ConfigError(f"{name} must be an integer") from exc
+    if value < 0:
+        raise ConfigError(f"{name} must be >= 0")
+    return value
+
+
+def _parse_unit_float(name: str, default: str) -> float:
+    raw = os.environ.get(name, default)
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ConfigError(f"{name} must be a number") from exc
+    if not (0.0 <= value <= 1.0):
+        raise ConfigError(f"{name} must be between 0 and 1")
+    return value
+
+
 def _parse_csv(raw: str | None) -> tuple[str, ...]:
     if not raw:
         return ()
-    items = [item.strip().lower() for item in raw.split(",")]
-    return tuple(item for item in items if item)
+    return _parse_csv_raw(raw.lower())
 
 
 def _parse_csv_raw(raw: str | None) -> tuple[str, ...]:
     if not raw:
         return ()
-    items = [item.strip() for item in raw.split(",")]
-    return tuple(item for item in items if item)
+    return tuple(item for item in map(str.strip, raw.split(",")) if item)
 
 
 def _parse_int_csv(raw: str | None) -> tuple[int, ...]:
@@ -136,10 +182,14 @@ def _parse_json_or_file(raw: str | None) -> dict[str, Any]:
         return {}
 
     raw = raw.strip()
-    maybe_path = Path(raw).expanduser()
-    if maybe_path.exists() and maybe_path.is_file():
-        return json.loads(maybe_path.read_text())
-    return json.loads(raw)
+    if raw.startswith(("{", "[")):
+        return fastjson.loads(raw)
+    try:
+        with open(os.path.expanduser(raw), "rb") as f:
+            data = f.read()
+    except OSError:
+        return fastjson.loads(raw)
+    return fastjson.loads(data)
 
 
 def _resolve_agent_md_path() -> Path:
@@ -147,6 +197,8 @@ def _resolve_agent_md_path() -> Path:
     if config_dir:
         return Path(config_dir).expanduser() / "AGENT.md"
 
+    import dotenv
+
     dotenv_path = dotenv.find_dotenv(usecwd=True)
     base_dir = Path(dotenv_path).resolve().parent if dotenv_path else Path.cwd().resolve()
     return base_dir / "AGENT.md"
@@ -158,6 +210,7 @@ def _resolve_config_dir() -> Path:
 
 
 def load_config() -> AppConfig:
+    _load_dotenv_once()
     token = os.environ.get("DISCORD_BOT_TOKEN", "").strip()
     if not token:
         raise ConfigError("DISCORD_BOT_TOKEN is required")
@@ -172,7 +225,7 @@ def load_config() -> AppConfig:
 
     try:
         model_config = _parse_json_or_file(os.environ.get("STRANDS_MODEL_CONFIG"))
-    except json.JSONDecodeError as exc:
+    except fastjson.JSONDecodeError as exc:
         raise ConfigError(f"Invalid STRANDS_MODEL_CONFIG: {exc}") from exc
     if not isinstance(model_config, dict):
         raise ConfigError("STRANDS_MODEL_CONFIG must be a JSON object")
@@ -185,20 +238,25 @@ def load_config() -> AppConfig:
     if model_id_from_env and not str(model_config.get("model_id", "")).strip():
         model_config = dict(model_config)
         model_config["model_id"] = model_id_from_env
-
-    session_max_turns = int(os.environ.get("SESSION_MAX_TURNS", "10"))
-    session_ttl_minutes = int(os.environ.get("SESSION_TTL_MINUTES", "30"))
-    auto_thread_archive_minutes = int(os.environ.get("AUTO_THREAD_ARCHIVE_MINUTES", "1440"))
-    agent_timeout_seconds = int(os.environ.get("AGENT_TIMEOUT_SECONDS", "45"))
-
-    if session_max_turns <= 0:
-        raise ConfigError("SESSION_MAX_TURNS must be > 0")
-    if session_ttl_minutes <= 0:
-        raise ConfigError("SESSION_TTL_MINUTES must be > 0")
-    if auto_thread_archive_minutes <= 0:
-        raise ConfigError("AUTO_THREAD_ARCHIVE_MINUTES must be > 0")
-    if agent_timeout_seconds <= 0:
-        raise ConfigError("AGENT_TIMEOUT_SECONDS must be > 0")
+    if provider == "openai" and openai_base_url:
+        # Resolve base_url here so the runtime can pass the config straight to the model class.
+        client_args = model_config.get("client_args")
+        if client_args is None:
+            client_args = {}
+        elif not isinstance(client_args, dict):
+            raise ConfigError("STRANDS_MODEL_CONFIG.client_args must be an object")
+        model_config = {**model_config, "client_args": {"base_url": openai_base_url, **client_args}}
+
+    session_max_turns = _parse_positive_int("SESSION_MAX_TURNS", "10")
+    session_ttl_minutes = _parse_positive_int("SESSION_TTL_MINUTES", "30")
+    auto_thread_archive_minutes = _parse_positive_int("AUTO_THREAD_ARCHIVE_MINUTES", "1440")
+    agent_timeout_seconds = _parse_positive_int("AGENT_TIMEOUT_SECONDS", "45")
+    agent_max_concurrent_invocations = _parse_positive_int("AGENT_MAX_CONCURRENT_INVOCATIONS", "1")
+    response_cache_ttl_seconds = _parse_non_negative_int("RESPONSE_CACHE_TTL_SECONDS", "0")
+    response_cache_similarity = _parse_unit_float("RESPONSE_CACHE_SIMILARITY", "0.9")
+
+    if response_cache_similarity == 0.0:
+        raise ConfigError("RESPONSE_CACHE_SIMILARITY must be within (0, 1]")
     if provider == "openai" and not str(model_config.get("model_id", "")).strip():
         raise ConfigError(
             "model_id is required for openai provider. "
@@ -215,36 +273,34 @@ def load_config() -> AppConfig:
         os.environ.get("SHELL_SRT_SETTINGS_PATH", "/app/config/srt-settings.json").strip()
         or "/app/config/srt-settings.json"
     )
-    shell_deny_path_prefixes = _parse_csv(
+    # Paths are matched case-sensitively by the tool guards, so keep them as written.
+    shell_deny_path_prefixes = _parse_csv_raw(
         os.environ.get(
             "SHELL_DENY_PATH_PREFIXES",
             "/app/.env,/app/.git,/app/config/AGENT.md,/app/config/mcp.json,/root/.ssh,/root/.gnupg,/root/.aws,/workspace/config/skills/nature-remo-skill/.env,/workspace/agent-memory/memory",
         )
     )
-    tool_write_roots = _parse_csv(os.environ.get("TOOL_WRITE_ROOTS", "/workspace"))
-    tool_read_roots = _parse_csv(
+    tool_write_roots = _parse_csv_raw(os.environ.get("TOOL_WRITE_ROOTS", "/workspace"))
+    tool_read_roots = _parse_csv_raw(
         os.environ.get(
             "TOOL_READ_ROOTS",
             ",".join([*tool_write_roots, "/app/config/skills"]),
         )
     )
     auth_required = _parse_bool(os.environ.get("AUTH_REQUIRED"), default=True)
-    auth_idle_timeout_minutes = int(os.environ.get("AUTH_IDLE_TIMEOUT_MINUTES", "15"))
-    auth_window_minutes = int(os.environ.get("AUTH_WINDOW_MINUTES", "10"))
-    auth_max_retries = int(os.environ.get("AUTH_MAX_RETRIES", "3"))
-    auth_lock_minutes = int(os.environ.get("AUTH_LOCK_MINUTES", "30"))
+    auth_idle_timeout_minutes = _parse_positive_int("AUTH_IDLE_TIMEOUT_MINUTES", "15")
+    auth_window_minutes = _parse_positive_int("AUTH_WINDOW_MINUTES", "10")
+    auth_max_retries = _parse_positive_int("AUTH_MAX_RETRIES", "3")
+    auth_lock_minutes = _parse_positive_int("AUTH_LOCK_MINUTES", "30")
     auth_command = os.environ.get("AUTH_COMMAND", "/auth").strip() or "/auth"
     defender_default_mode = os.environ.get("DEFENDER_DEFAULT_MODE", "warn").strip().lower() or "warn"
     defender_sanitize_mode = os.environ.get("DEFENDER_SANITIZE_MODE", "full-redact").strip().lower() or "full-redact"
-    defender_block_threshold = float(os.environ.get("DEFENDER_BLOCK_THRESHOLD", "0.95"))
-    defender_warn_threshold = float(os.environ.get("DEFENDER_WARN_THRESHOLD", "0.35"))
+    defender_warn_threshold = _parse_unit_float("DEFENDER_WARN_THRESHOLD", "0.35")
+    defender_block_threshold = _parse_unit_float("DEFENDER_BLOCK_THRESHOLD", "0.95")
 
-    if auth_idle_timeout_minutes <= 0:
-        raise ConfigError("AUTH_IDLE_TIMEOUT_MINUTES must be > 0")
     if auto_thread_mode not in {"keyword", "channel"}:
         raise ConfigError("AUTO_THREAD_MODE must be one of: keyword, channel")
-    supported_dangerous_tools = {"file_read", "file_write", "editor", "environment", "shell"}
-    invalid_dangerous_tools = [name for name in enabled_dangerous_tools if name not in supported_dangerous_tools]
+    invalid_dangerous_tools = [name for name in enabled_dangerous_tools if name not in _SUPPORTED_DANGEROUS_TOOLS]
     if invalid_dangerous_tools:
         raise ConfigError(
             "ENABLED_DANGEROUS_TOOLS contains unsupported tools: "
@@ -266,22 +322,12 @@ def load_config() -> AppConfig:
         raise ConfigError("TOOL_READ_ROOTS must contain absolute paths")
     if auth_required and not auth_passphrase:
         raise ConfigError("AUTH_PASSPHRASE is required when AUTH_REQUIRED=true")
-    if auth_window_minutes <= 0:
-        raise ConfigError("AUTH_WINDOW_MINUTES must be > 0")
-    if auth_max_retries <= 0:
-        raise ConfigError("AUTH_MAX_RETRIES must be > 0")
-    if auth_lock_minutes <= 0:
-        raise ConfigError("AUTH_LOCK_MINUTES must be > 0")
     if not auth_command.startswith("/"):
         raise ConfigError("AUTH_COMMAND must start with '/'")
     if defender_default_mode not in {"warn", "sanitize", "block"}:
         raise ConfigError("DEFENDER_DEFAULT_MODE must be one of: warn, sanitize, block")
     if defender_sanitize_mode not in {"full-redact"}:
         raise ConfigError("DEFENDER_SANITIZE_MODE must be 'full-redact'")
-    if not (0.0 <= defender_warn_threshold <= 1.0):
-        raise ConfigError("DEFENDER_WARN_THRESHOLD must be between 0 and 1")
-    if not (0.0 <= defender_block_threshold <= 1.0):
-        raise ConfigError("DEFENDER_BLOCK_THRESHOLD must be between 0 and 1")
     if defender_warn_threshold > defender_block_threshold:
         raise ConfigError("DEFENDER_WARN_THRESHOLD must be <= DEFENDER_BLOCK_THRESHOLD")
 
@@ -303,9 +349,7 @@ def load_config() -> AppConfig:
     cron_default_timezone = (
         os.environ.get("CRON_DEFAULT_TIMEZONE", "Asia/Tokyo").strip() or "Asia/Tokyo"
     )
-    cron_poll_seconds = int(os.environ.get("CRON_POLL_SECONDS", "15"))
-    if cron_poll_seconds <= 0:
-        raise ConfigError("CRON_POLL_SECONDS must be > 0")
+    cron_poll_seconds = _parse_positive_int("CRON_POLL_SECONDS", "15")
     claude_subagent_enabled = _parse_bool(
         os.environ.get("CLAUDE_SUBAGENT_ENABLED"),
         default=False,
@@ -317,9 +361,7 @@ def load_config() -> AppConfig:
         os.environ.get("CLAUDE_SUBAGENT_WORKDIR", "/workspace/bot-rw").strip()
         or "/workspace/bot-rw"
     )
-    claude_subagent_timeout_seconds = int(
-        os.environ.get("CLAUDE_SUBAGENT_TIMEOUT_SECONDS", "300")
-    )
+    claude_subagent_timeout_seconds = _parse_positive_int("CLAUDE_SUBAGENT_TIMEOUT_SECONDS", "300")
     claude_subagent_model = (
         os.environ.get("CLAUDE_SUBAGENT_MODEL", "").strip() or None
     )
@@ -335,8 +377,6 @@ def load_config() -> AppConfig:
         or "http://claude-runner:8787/v1/run"
     )
     claude_subagent_sidecar_token = os.environ.get("CLAUDE_SUBAGENT_SIDECAR_TOKEN", "").strip()
-    if claude_subagent_timeout_seconds <= 0:
-        raise ConfigError("CLAUDE_SUBAGENT_TIMEOUT_SECONDS must be > 0")
     if not claude_subagent_workdir.startswith("/"):
         raise ConfigError("CLAUDE_SUBAGENT_WORKDIR must be an absolute path")
     if any(ch.isspace() for ch in claude_subagent_command):
@@ -357,7 +397,7 @@ def load_config() -> AppConfig:
         os.environ.get("CLAUDE_HOOKS_ENABLED"),
         default=False,
     )
-    claude_hooks_timeout_ms = int(os.environ.get("CLAUDE_HOOKS_TIMEOUT_MS", "5000"))
+    claude_hooks_timeout_ms = _parse_positive_int("CLAUDE_HOOKS_TIMEOUT_MS", "5000")
     claude_hooks_fail_mode = (
         os.environ.get("CLAUDE_HOOKS_FAIL_MODE", "open").strip().lower() or "open"
     )
@@ -367,8 +407,6 @@ def load_config() -> AppConfig:
             ".claude/settings.local.json,.claude/settings.json,~/.claude/settings.json",
         )
     )
-    if claude_hooks_timeout_ms <= 0:
-        raise ConfigError("CLAUDE_HOOKS_TIMEOUT_MS must be > 0")
     if claude_hooks_fail_mode not in {"open", "closed"}:
         raise ConfigError("CLAUDE_HOOKS_FAIL_MODE must be one of: open, closed")
     if not claude_hooks_settings_paths:
@@ -376,7 +414,7 @@ def load_config() -> AppConfig:
 
     security_enabled = _parse_bool(os.environ.get("SECURITY_ENABLED"), default=False)
     security_alert_bind_host = os.environ.get("SECURITY_ALERT_BIND_HOST", "127.0.0.1").strip() or "127.0.0.1"
-    security_alert_bind_port = int(os.environ.get("SECURITY_ALERT_BIND_PORT", "8088"))
+    security_alert_bind_port = _parse_positive_int("SECURITY_ALERT_BIND_PORT", "8088")
     security_rules_path = Path(
         os.environ.get("SECURITY_RULES_PATH", "/app/config/security/detection-rules.yaml").strip()
         or "/app/config/security/detection-rules.yaml"
@@ -388,20 +426,14 @@ def load_config() -> AppConfig:
     ).expanduser()
     security_alert_channel_id = os.environ.get("SECURITY_ALERT_CHANNEL_ID", "").strip()
     security_port_monitor_enabled = _parse_bool(os.environ.get("SECURITY_PORT_MONITOR_ENABLED"), default=True)
-    security_port_monitor_interval_seconds = int(os.environ.get("SECURITY_PORT_MONITOR_INTERVAL_SECONDS", "60"))
+    security_port_monitor_interval_seconds = _parse_positive_int("SECURITY_PORT_MONITOR_INTERVAL_SECONDS", "60")
     security_port_monitor_protocols = _parse_csv(os.environ.get("SECURITY_PORT_MONITOR_PROTOCOLS", "tcp"))
     security_port_monitor_exclude_ports = _parse_int_csv(os.environ.get("SECURITY_PORT_MONITOR_EXCLUDE_PORTS", ""))
     security_resource_monitor_enabled = _parse_bool(os.environ.get("SECURITY_RESOURCE_MONITOR_ENABLED"), default=True)
-    security_resource_monitor_interval_seconds = int(os.environ.get("SECURITY_RESOURCE_MONITOR_INTERVAL_SECONDS", "60"))
+    security_resource_monitor_interval_seconds = _parse_positive_int("SECURITY_RESOURCE_MONITOR_INTERVAL_SECONDS", "60")
     security_cpu_load_percent_threshold = int(os.environ.get("SECURITY_CPU_LOAD_PERCENT_THRESHOLD", "85"))
     security_memory_percent_threshold = int(os.environ.get("SECURITY_MEMORY_PERCENT_THRESHOLD", "90"))
     security_disk_percent_threshold = int(os.environ.get("SECURITY_DISK_PERCENT_THRESHOLD", "90"))
-    if security_alert_bind_port <= 0:
-        raise ConfigError("SECURITY_ALERT_BIND_PORT must be > 0")
-    if security_port_monitor_interval_seconds <= 0:
-        raise ConfigError("SECURITY_PORT_MONITOR_INTERVAL_SECONDS must be > 0")
-    if security_resource_monitor_interval_seconds <= 0:
-        raise ConfigError("SECURITY_RESOURCE_MONITOR_INTERVAL_SECONDS must be > 0")
     if security_enabled and not security_alert_channel_id:
         raise ConfigError("SECURITY_ALERT_CHANNEL_ID is required when SECURITY_ENABLED=true")
 
@@ -416,7 +448,7 @@ def load_config() -> AppConfig:
         auto_reply_all=_parse_bool(os.environ.get("AUTO_REPLY_ALL"), default=True),
         auto_thread_enabled=_parse_bool(os.environ.get("AUTO_THREAD_ENABLED"), default=False),
         auto_thread_mode=auto_thread_mode,
-        auto_thread_channel_ids=_parse_csv(os.environ.get("AUTO_THREAD_CHANNEL_IDS", "")),
+        auto_thread_channel_ids=_parse_csv_raw(os.environ.get("AUTO_THREAD_CHANNEL_IDS", "")),
         auto_thread_trigger_keywords=_parse_csv(
             os.environ.get(
                 "AUTO_THREAD_TRIGGER_KEYWORDS",
@@ -429,6 +461,9 @@ def load_config() -> AppConfig:
             default=True,
         ),
         agent_timeout_seconds=agent_timeout_seconds,
+        agent_max_concurrent_invocations=agent_max_concurrent_invocations,
+        response_cache_ttl_seconds=response_cache_ttl_seconds,
+        response_cache_similarity=response_cache_similarity,
         bot_fallback_message=os.environ.get(
             "BOT_FALLBACK_MESSAGE",
             "今ちょっと調子が悪いです。少し待ってからもう一度お願いします。",
@@ -507,4 +542,7 @@ def to_runtime_settings(config: AppConfig) -> RuntimeSettings:
         max_messages=config.session_max_turns * 2,
         ttl_seconds=config.session_ttl_minutes * 60,
         timeout_seconds=config.agent_timeout_seconds,
+        max_concurrent_invocations=config.agent_max_concurrent_invocations,
+        response_cache_ttl_seconds=config.response_cache_ttl_seconds,
+        response_cache_similarity=config.response_cache_similarity,
     )
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import hmac
 import io
 import ipaddress
@@ -11,7 +12,9 @@ import re
 import socket
 import time
 import urllib.request
+from contextlib import nullcontext
 from dataclasses import dataclass, replace
+from functools import cached_property
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Awaitable, Callable, Protocol
@@ -34,6 +37,13 @@ from deepbot.security import DefenderSettings, PromptInjectionDefender
 
 logger = logging.getLogger(__name__)
 
+# Per-process key so passphrase digests are never comparable across runs.
+_AUTH_DIGEST_KEY = os.urandom(32)
+
+
+def _auth_digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=32, key=_AUTH_DIGEST_KEY).digest()
+
 
 class SendableChannel(Protocol):
     async def send(self, content: str) -> Any: ...
@@ -73,6 +83,10 @@ class AuthConfig:
     def enabled(self) -> bool:
         return bool(self.passphrase)
 
+    @cached_property
+    def passphrase_digest(self) -> bytes:
+        return _auth_digest(self.passphrase)
+
 
 @dataclass
 class _AuthSessionState:
@@ -120,7 +134,14 @@ class _SurfaceState:
 
 
 class MessageProcessor:
-    _SUPPORTED_IMAGE_FORMATS = {"png", "jpeg", "gif", "webp"}
+    # Maps MIME subtypes / file extensions to the Strands image format name.
+    _IMAGE_FORMAT_BY_NAME = {
+        "png": "png",
+        "jpeg": "jpeg",
+        "jpg": "jpeg",
+        "gif": "gif",
+        "webp": "webp",
+    }
     _MAX_IMAGE_ATTACHMENTS = 3
     _MAX_IMAGE_BYTES = 5 * 1024 * 1024
     _AGENT_MEMORY_PREFIX_RE = re.compile(
@@ -813,7 +834,7 @@ class MessageProcessor:
             reply = await self._runtime.generate_reply(
                 AgentRequest(
                     session_id=session_id,
-                    context=latest_context,
+                    context=tuple(latest_context),
                     image_attachments=(),
                     tool_event_callback=_tool_event,
                 )
@@ -1193,11 +1214,13 @@ class MessageProcessor:
             reply = await self._runtime.generate_reply(
                 AgentRequest(
                     session_id=session_id,
-                    context=context,
+                    context=tuple(context),
                     image_attachments=(),
                     enabled_skills=job.skills,
                     allowed_mcp_servers=job.mcp_servers,
                     allowed_mcp_tools=job.mcp_tools,
+                    # Scheduled prompts repeat verbatim but expect fresh results on every run.
+                    bypass_response_cache=True,
                 )
             )
             structured = self._structured_reply_from_text(reply, session_id=session_id)
@@ -1369,8 +1392,8 @@ class MessageProcessor:
                     f"{self._seconds_to_minutes_text(remaining)}後に再試行してください。"
                 )
 
-            # compare_digest on str supports ASCII only on some Python versions.
-            if hmac.compare_digest(attempt.encode("utf-8"), config.passphrase.encode("utf-8")):
+            # Fixed-size digests keep the comparison independent of the passphrase length too.
+            if hmac.compare_digest(_auth_digest(attempt), config.passphrase_digest):
                 state.failed_attempts = 0
                 state.locked_until = None
                 state.authenticated_until = now + config.auth_window_seconds
@@ -1470,17 +1493,11 @@ class MessageProcessor:
         if attachment.content_type:
             ct = attachment.content_type.lower()
             if ct.startswith("image/"):
-                fmt = ct.split("/", 1)[1].split(";", 1)[0].strip()
-                if fmt == "jpg":
-                    fmt = "jpeg"
-                if fmt in cls._SUPPORTED_IMAGE_FORMATS:
+                fmt = cls._IMAGE_FORMAT_BY_NAME.get(ct[6:].split(";", 1)[0].strip())
+                if fmt is not None:
                     return fmt
         suffix = Path(attachment.filename).suffix.lower().lstrip(".")
-        if suffix == "jpg":
-            suffix = "jpeg"
-        if suffix in cls._SUPPORTED_IMAGE_FORMATS:
-            return suffix
-        return None
+        return cls._IMAGE_FORMAT_BY_NAME.get(suffix)
 
     @staticmethod
     def _is_public_ip_address(value: str) -> bool:
@@ -1626,6 +1643,9 @@ class MessageProcessor:
             await self._store.clear(session_id)
             await self._clear_auth_state(session_id)
             self._clear_surface_states_for_session(session_id)
+            clear_cached_replies = getattr(self._runtime, "clear_cached_replies", None)
+            if clear_cached_replies is not None:
+                clear_cached_replies(session_id)
             if self._audit_logger is not None:
                 self._audit_logger.log_event(event="reset", session_id=session_id)
             await self._send_reply_safely(
@@ -1783,7 +1803,7 @@ class MessageProcessor:
             reply = await self._runtime.generate_reply(
                 AgentRequest(
                     session_id=session_id,
-                    context=context,
+                    context=tuple(context),
                     image_attachments=tuple(image_attachments),
                     progress_callback=_progress_update,
                     tool_event_callback=_tool_event,
@@ -1901,9 +1921,10 @@ class MessageProcessor:
             reply = await self._runtime.generate_reply(
                 AgentRequest(
                     session_id=session_id,
-                    context=rerun_context,
+                    context=tuple(rerun_context),
                     image_attachments=(),
                     tool_event_callback=_tool_event,
+                    bypass_response_cache=True,
                 )
             )
         except Exception:
@@ -2007,7 +2028,7 @@ class MessageProcessor:
             reply = await self._runtime.generate_reply(
                 AgentRequest(
                     session_id=session_id,
-                    context=latest_context,
+                    context=tuple(latest_context),
                     image_attachments=(),
                     tool_event_callback=_tool_event,
                 )
@@ -3073,6 +3094,11 @@ class DeepbotClientFactory:
                     await scheduler.stop()
                 if processor._security_service is not None:
                     processor._security_service.stop()
+                runtime_aclose = getattr(processor._runtime, "aclose", None)
+                if runtime_aclose is not None:
+                    await runtime_aclose()
+                if processor._audit_logger is not None:
+                    processor._audit_logger.close()
                 await super().close()
 
             async def on_message(self, message: Any) -> None:
@@ -3291,9 +3317,11 @@ class DeepbotClientFactory:
                         return
                     await interaction.followup.send("再実行しました。", ephemeral=True)
 
-                await processor.handle_message(
-                    envelope,
-                    send_reply=_send_channel_reply,
-                )
+                audit_logger = processor._audit_logger
+                with audit_logger.turn() if audit_logger is not None else nullcontext():
+                    await processor.handle_message(
+                        envelope,
+                        send_reply=_send_channel_reply,
+                    )
 
         return DeepbotClient(intents=intents)
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import importlib
 import json
 import logging
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse, urlunparse
@@ -11,36 +14,44 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_MCP_CONFIG_PATH = Path("/app/config/mcp.json")
 
-try:
-    from strands.tools.mcp import MCPClient
-except Exception:  # pragma: no cover
-    MCPClient = None  # type: ignore[assignment]
 
-try:
-    from strands.tools.registry import ToolProvider
-except Exception:  # pragma: no cover
-    class ToolProvider:  # type: ignore[no-redef]
-        pass
+@dataclass(frozen=True)
+class _McpBindings:
+    mcp_client: Any | None
+    stdio_server_parameters: Any | None
+    stdio_client: Any | None
+    sse_client: Any | None
+    streamablehttp_client: Any | None
 
-try:
-    from mcp import StdioServerParameters, stdio_client
-except Exception:  # pragma: no cover
-    StdioServerParameters = None  # type: ignore[assignment]
-    stdio_client = None  # type: ignore[assignment]
 
-try:
-    from mcp.client.sse import sse_client
-except Exception:  # pragma: no cover
-    sse_client = None  # type: ignore[assignment]
+def _import_optional(module_name: str, attr: str) -> Any | None:
+    try:
+        module = importlib.import_module(module_name)
+    except Exception:  # pragma: no cover
+        return None
+    return getattr(module, attr, None)
+
+
+@lru_cache(maxsize=1)
+def _mcp_bindings() -> _McpBindings:
+    # strands.tools.mcp pulls in the whole SDK (~1s), so defer it until an MCP server is configured.
+    tool_provider = _import_optional("strands.tools.registry", "ToolProvider")
+    if tool_provider is not None:
+        tool_provider.register(SafeMCPClient)
+    return _McpBindings(
+        mcp_client=_import_optional("strands.tools.mcp", "MCPClient"),
+        stdio_server_parameters=_import_optional("mcp", "StdioServerParameters"),
+        stdio_client=_import_optional("mcp", "stdio_client"),
+        sse_client=_import_optional("mcp.client.sse", "sse_client"),
+        streamablehttp_client=_import_optional("mcp.client.streamable_http", "streamablehttp_client"),
+    )
 
-try:
-    from mcp.client.streamable_http import streamablehttp_client
-except Exception:  # pragma: no cover
-    streamablehttp_client = None  # type: ignore[assignment]
 
+class SafeMCPClient:
+    """Fail-soft wrapper so broken MCP servers do not break agent startup.
 
-class SafeMCPClient(ToolProvider):
-    """Fail-soft wrapper so broken MCP servers do not break agent startup."""
+    Registered as a virtual subclass of strands' ToolProvider by _mcp_bindings().
+    """
 
     def __init__(self, inner: Any, *, name: str) -> None:
         self._inner = inner
@@ -102,6 +113,12 @@ def _load_mcp_servers(config_path: Path) -> dict[str, dict[str, Any]]:
 
 
 def _create_mcp_client(server_name: str, server_config: dict[str, Any]) -> Any | None:
+    bindings = _mcp_bindings()
+    MCPClient = bindings.mcp_client
+    sse_client = bindings.sse_client
+    streamablehttp_client = bindings.streamablehttp_client
+    stdio_client = bindings.stdio_client
+    StdioServerParameters = bindings.stdio_server_parameters
     if MCPClient is None:
         logger.warning("strands.tools.mcp is unavailable. MCP server '%s' is skipped.", server_name)
         return None
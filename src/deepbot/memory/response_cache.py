@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NGRAM_SIZE = 3
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    query: str
+    grams: frozenset[str]
+    reply: str
+    timestamp: float
+    scope: Hashable = ()
+
+
+def normalize_query(text: str) -> str:
+    normalized = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def query_grams(normalized: str) -> frozenset[str]:
+    # Character n-grams work for both space-delimited and Japanese text without a tokenizer.
+    if len(normalized) <= _NGRAM_SIZE:
+        return frozenset((normalized,)) if normalized else frozenset()
+    return frozenset(normalized[i : i + _NGRAM_SIZE] for i in range(len(normalized) - _NGRAM_SIZE + 1))
+
+
+def query_similarity(left: frozenset[str], right: frozenset[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class ResponseCache:
+    """Per-session cache of replies for repeated or near-duplicate user queries."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: int,
+        similarity_threshold: float,
+        max_entries_per_session: int = 32,
+        time_fn: Callable[[], float] | None = None,
+    ) -> None:
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be > 0")
+        if not (0.0 < similarity_threshold <= 1.0):
+            raise ValueError("similarity_threshold must be within (0, 1]")
+        if max_entries_per_session <= 0:
+            raise ValueError("max_entries_per_session must be > 0")
+
+        self._ttl_seconds = ttl_seconds
+        self._similarity_threshold = similarity_threshold
+        self._max_entries = max_entries_per_session
+        self._time_fn = time_fn or time.time
+        self._sessions: dict[str, deque[CachedResponse]] = {}
+
+    def lookup(self, session_id: str, query: str, *, scope: Hashable = ()) -> str | None:
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        entries = self._live_entries(session_id)
+        if not entries:
+            return None
+
+        grams = query_grams(normalized)
+        best_reply: str | None = None
+        best_score = 0.0
+        for entry in entries:
+            # Replies produced under different skills or MCP tools are not interchangeable.
+            if entry.scope != scope:
+                continue
+            if entry.query == normalized:
+                return entry.reply
+            score = query_similarity(grams, entry.grams)
+            if score > best_score:
+                best_score = score
+                best_reply = entry.reply
+        if best_score >= self._similarity_threshold:
+            return best_reply
+        return None
+
+    def store(self, session_id: str, query: str, reply: str, *, scope: Hashable = ()) -> None:
+        normalized = normalize_query(query)
+        if not normalized or not reply:
+            return
+        now = self._time_fn()
+        self._evict_expired_sessions(now)
+        entries = self._sessions.setdefault(session_id, deque(maxlen=self._max_entries))
+        entries.append(
+            CachedResponse(
+                query=normalized,
+                grams=query_grams(normalized),
+                reply=reply,
+                timestamp=now,
+                scope=scope,
+            )
+        )
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def _live_entries(self, session_id: str) -> deque[CachedResponse] | None:
+        entries = self._sessions.get(session_id)
+        if not entries:
+            return None
+        cutoff = self._time_fn() - self._ttl_seconds
+        # Entries are appended in time order, so expired ones are always at the front.
+        while entries and entries[0].timestamp < cutoff:
+            entries.popleft()
+        if not entries:
+            self._sessions.pop(session_id, None)
+            return None
+        return entries
+
+    def _evict_expired_sessions(self, now: float) -> None:
+        cutoff = now - self._ttl_seconds
+        stale_ids = [
+            session_id
+            for session_id, entries in self._sessions.items()
+            if not entries or entries[-1].timestamp < cutoff
+        ]
+        for session_id in stale_ids:
+            self._sessions.pop(session_id, None)
@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import os
 import re
+import time
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
 from deepbot.security.normalizer import sanitize_for_prompt
 
@@ -13,6 +17,11 @@ SKILL_PREFIX_RE = re.compile(
 )
 FRONTMATTER_RE = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
 
+# Directory mtime only changes when skills are added/removed, so edits to an existing
+# SKILL.md are picked up once the TTL expires.
+SKILLS_CACHE_TTL_SECONDS = 30.0
+_skills_cache: dict[Path, tuple[int, float, tuple["Skill", ...]]] = {}
+
 
 @dataclass(frozen=True)
 class Skill:
@@ -58,20 +67,63 @@ def list_skills() -> list[Skill]:
     return skills
 
 
-def extract_selected_skill(user_text: str, skills: list[Skill]) -> tuple[Skill | None, str]:
-    match = SKILL_PREFIX_RE.match(user_text.strip())
-    if not match:
-        return None, user_text
+def get_cached_skills() -> tuple[Skill, ...]:
+    skills_dir = get_skills_dir()
+    try:
+        mtime_ns = skills_dir.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = -1
+    now = time.monotonic()
+    cached = _skills_cache.get(skills_dir)
+    if cached is not None and cached[0] == mtime_ns and now - cached[1] < SKILLS_CACHE_TTL_SECONDS:
+        return cached[2]
+    skills = tuple(list_skills())
+    _skills_cache[skills_dir] = (mtime_ns, now, skills)
+    return skills
+
+
+def clear_skills_cache() -> None:
+    _skills_cache.clear()
+    get_skills_discovery_prompt.cache_clear()
+    get_skill_extractor.cache_clear()
+
+
+@dataclass(frozen=True)
+class SkillExtractor:
+    by_name: Mapping[str, Skill]
+
+    def extract(self, user_text: str) -> tuple[Skill | None, str]:
+        if not self.by_name:
+            return None, user_text
+        match = SKILL_PREFIX_RE.match(user_text.strip())
+        if not match:
+            return None, user_text
+
+        skill = self.by_name.get(match.group("name"))
+        if skill is None:
+            return None, user_text
+        return skill, (match.group("rest") or "").strip()
+
+
+@lru_cache(maxsize=32)
+def get_skill_extractor(skills: tuple[Skill, ...]) -> SkillExtractor:
+    by_name: dict[str, Skill] = {}
+    for skill in skills:
+        # Keep the first skill for a duplicated name, matching the previous linear scan.
+        by_name.setdefault(skill.name, skill)
+    return SkillExtractor(by_name=MappingProxyType(by_name))
+
+
+def extract_selected_skill(user_text: str, skills: Sequence[Skill]) -> tuple[Skill | None, str]:
+    return get_skill_extractor(tuple(skills)).extract(user_text)
+
 
-    skill_name = match.group("name")
-    rest = (match.group("rest") or "").strip()
-    skill = next((s for s in skills if s.name == skill_name), None)
-    if skill is None:
-        return None, user_text
-    return skill, rest
+@lru_cache(maxsize=32)
+def get_skills_discovery_prompt(skills: tuple[Skill, ...]) -> str | None:
+    return build_skills_discovery_prompt(skills)
 
 
-def build_skills_discovery_prompt(skills: list[Skill]) -> str | None:
+def build_skills_discovery_prompt(skills: Sequence[Skill]) -> str | None:
     if not skills:
         return None
     lines = [
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import asyncio
+import os
+import subprocess
+import sys
 import threading
 import time
+from pathlib import Path
 
 import pytest
 
+import deepbot
 from deepbot.agent.runtime import (
     AgentRequest,
     AgentRuntime,
     ImageAttachment,
     _patch_openai_image_content_formatter,
 )
+from deepbot.config import ConfigError
 
 
 @pytest.mark.asyncio
@@ -39,6 +45,31 @@ async def test_agent_runtime_timeout() -> None:
         await runtime.generate_reply(AgentRequest(session_id="s1", context=[]))
 
 
+@pytest.mark.asyncio
+async def test_agent_runtime_holds_timed_out_agent_until_its_call_finishes() -> None:
+    class SlowFirstAgent:
+        def __init__(self) -> None:
+            self.busy = False
+            self.calls = 0
+
+        def __call__(self, _: str) -> str:
+            assert not self.busy
+            self.busy = True
+            self.calls += 1
+            if self.calls == 1:
+                time.sleep(0.2)
+            self.busy = False
+            return f"call {self.calls}"
+
+    agent = SlowFirstAgent()
+    runtime = AgentRuntime(agent_callable=agent, timeout_seconds=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await runtime.generate_reply(AgentRequest(session_id="s1", context=()))
+    assert await runtime.generate_reply(AgentRequest(session_id="s2", context=())) == "call 2"
+    await runtime.aclose()
+
+
 @pytest.mark.asyncio
 async def test_agent_runtime_serializes_concurrent_calls() -> None:
     state_lock = threading.Lock()
@@ -65,6 +96,24 @@ async def test_agent_runtime_serializes_concurrent_calls() -> None:
     assert max_in_flight == 1
 
 
+@pytest.mark.asyncio
+async def test_agent_runtime_allows_configured_concurrency() -> None:
+    both_started = threading.Barrier(2, timeout=1)
+
+    def blocking_agent(_: str) -> str:
+        both_started.wait()
+        return "done"
+
+    runtime = AgentRuntime(agent_callable=blocking_agent, timeout_seconds=2, max_concurrent_invocations=2)
+
+    replies = await asyncio.gather(
+        runtime.generate_reply(AgentRequest(session_id="s1", context=[])),
+        runtime.generate_reply(AgentRequest(session_id="s2", context=[])),
+    )
+
+    assert replies == ["done", "done"]
+
+
 def test_build_prompt_skips_empty_context_messages() -> None:
     prompt = AgentRuntime._build_prompt(
         AgentRequest(
@@ -129,6 +178,19 @@ def test_openai_image_formatter_patch_normalizes_empty_text_block() -> None:
     assert formatted["text"] == " "
 
 
+def test_openai_image_formatter_patch_forwards_keyword_arguments() -> None:
+    class DummyOpenAIModel:
+        @classmethod
+        def format_request_message_content(cls, content, **kwargs):
+            return {"type": "text", "text": str(sorted(kwargs))}
+
+    _patch_openai_image_content_formatter(DummyOpenAIModel)
+    _patch_openai_image_content_formatter(DummyOpenAIModel)
+
+    assert DummyOpenAIModel.format_request_message_content({"text": ""})["text"] == "[]"
+    assert DummyOpenAIModel.format_request_message_content({"text": ""}, kind="x")["text"] == "['kind']"
+
+
 @pytest.mark.asyncio
 async def test_agent_runtime_stream_async_sends_progress_and_result() -> None:
     class StreamingAgent:
@@ -220,3 +282,371 @@ async def test_agent_runtime_stream_async_timeout_returns_partial_text() -> None
     )
     assert "途中結果" in result
     assert "ここまでの結果" in result
+
+
+def test_build_prompt_keeps_static_prefix_before_session_id() -> None:
+    first = AgentRuntime._build_prompt(
+        AgentRequest(session_id="s1", context=[{"role": "user", "content": "hello"}])
+    )
+    second = AgentRuntime._build_prompt(
+        AgentRequest(
+            session_id="s2",
+            context=[{"role": "user", "content": "hello"}],
+            allowed_mcp_servers=("github",),
+        )
+    )
+
+    prefix = first.split("Session ID:", 1)[0]
+    assert prefix
+    assert second.startswith(prefix)
+    assert "Allowed MCP servers for this run: github" in second.split("Session ID: s2", 1)[1]
+
+
+def test_build_prompt_strips_selected_skill_without_mutating_context(monkeypatch, tmp_path) -> None:
+    skill_dir = tmp_path / "config" / "skills" / "writer"
+    skill_dir.mkdir(parents=True)
+    (skill_dir / "SKILL.md").write_text(
+        "---\nname: writer\ndescription: write better text\n---\n\n# writer\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("DEEPBOT_CONFIG_DIR", str(tmp_path / "config"))
+    context = [
+        {"role": "user", "content": "$writer first"},
+        {"role": "user", "content": "$writer make this concise"},
+    ]
+
+    prompt = AgentRuntime._build_prompt(AgentRequest(session_id="s1", context=context))
+
+    assert "[user] $writer first" in prompt
+    assert "[user] make this concise" in prompt
+    assert "## Selected Skill" in prompt
+    assert context[-1]["content"] == "$writer make this concise"
+
+
+def test_importing_runtime_does_not_import_mcp_sdk() -> None:
+    code = (
+        "import sys; import deepbot.agent.runtime; "
+        "print('strands.tools.mcp' in sys.modules, 'deepbot.mcp_tools' in sys.modules)"
+    )
+    src_dir = Path(deepbot.__file__).resolve().parents[1]
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": str(src_dir)},
+    )
+
+    assert completed.stdout.split() == ["False", "False"]
+
+
+def test_import_tool_module_returns_error_instead_of_raising() -> None:
+    from deepbot.agent.runtime import _import_tool_module
+
+    module, error = _import_tool_module(("json", "dumps"))
+    assert error is None
+    assert module.dumps is not None
+
+    module, error = _import_tool_module(("deepbot_missing_tool_pkg", "tool"))
+    assert module is None
+    assert isinstance(error, ModuleNotFoundError)
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_retries_without_images_when_provider_rejects_them(monkeypatch) -> None:
+    calls: list[object] = []
+    build_calls = 0
+    original_build_prompt = AgentRuntime._build_prompt
+
+    def counting_build_prompt(request: AgentRequest) -> str:
+        nonlocal build_calls
+        build_calls += 1
+        return original_build_prompt(request)
+
+    def agent(model_input: object) -> str:
+        calls.append(model_input)
+        if isinstance(model_input, list):
+            raise RuntimeError("Unsupported image format")
+        return "text only"
+
+    monkeypatch.setattr(AgentRuntime, "_build_prompt", staticmethod(counting_build_prompt))
+    runtime = AgentRuntime(agent_callable=agent, timeout_seconds=1)
+    request = AgentRequest(
+        session_id="s1",
+        context=[{"role": "user", "content": "look"}],
+        image_attachments=(ImageAttachment(format="png", data=b"\x89PNG"),),
+    )
+
+    assert await runtime.generate_reply(request) == "text only"
+    assert isinstance(calls[0], list)
+    assert isinstance(calls[1], str)
+    assert build_calls == 1
+
+    build_calls = 0
+    ok_runtime = AgentRuntime(agent_callable=lambda _: "ok", timeout_seconds=1)
+    assert await ok_runtime.generate_reply(request) == "ok"
+    assert build_calls == 1
+
+
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        ("Invalid API parameter: messages[0]", True),
+        ("Unsupported image type", True),
+        ("image_url is INVALID for this model", True),
+        ("invalid\nimage payload", True),
+        ("rate limit exceeded", False),
+        ("invalid token", False),
+    ],
+)
+def test_should_retry_without_images_matches_image_rejections(message: str, expected: bool) -> None:
+    assert AgentRuntime._should_retry_without_images(RuntimeError(message)) is expected
+
+
+def test_load_agent_md_rereads_file_only_when_it_changes(tmp_path) -> None:
+    from deepbot.agent.runtime import _load_agent_md, _read_agent_md
+
+    agent_md = tmp_path / "AGENT.md"
+    agent_md.write_text("first\n", encoding="utf-8")
+    _read_agent_md.cache_clear()
+
+    assert _load_agent_md(agent_md) == "first"
+    assert _load_agent_md(agent_md) == "first"
+    assert _read_agent_md.cache_info().hits == 1
+
+    agent_md.write_text("second version\n", encoding="utf-8")
+    assert _load_agent_md(agent_md) == "second version"
+    assert _load_agent_md(tmp_path / "missing.md") == ""
+    assert _load_agent_md(tmp_path) == ""
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_serves_repeated_question_from_response_cache() -> None:
+    from deepbot.memory.response_cache import ResponseCache
+
+    calls = 0
+
+    def agent(_: str) -> str:
+        nonlocal calls
+        calls += 1
+        return f"answer {calls}"
+
+    runtime = AgentRuntime(
+        agent_callable=agent,
+        timeout_seconds=1,
+        response_cache=ResponseCache(ttl_seconds=60, similarity_threshold=0.9),
+    )
+    request = AgentRequest(session_id="s1", context=({"role": "user", "content": "What is deepbot?"},))
+
+    assert await runtime.generate_reply(request) == "answer 1"
+    assert await runtime.generate_reply(request) == "answer 1"
+    assert calls == 1
+
+    with_image = AgentRequest(
+        session_id="s1",
+        context=request.context,
+        image_attachments=(ImageAttachment(format="png", data=b"\x89PNG"),),
+    )
+    assert await runtime.generate_reply(with_image) == "answer 2"
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_response_cache_respects_bypass_scope_and_clear() -> None:
+    from deepbot.memory.response_cache import ResponseCache
+
+    calls = 0
+
+    def agent(_: str) -> str:
+        nonlocal calls
+        calls += 1
+        return f"answer {calls}"
+
+    runtime = AgentRuntime(
+        agent_callable=agent,
+        timeout_seconds=1,
+        response_cache=ResponseCache(ttl_seconds=60, similarity_threshold=0.9),
+    )
+    context = ({"role": "user", "content": "What is deepbot?"},)
+    request = AgentRequest(session_id="s1", context=context)
+
+    assert await runtime.generate_reply(request) == "answer 1"
+    bypass = AgentRequest(session_id="s1", context=context, bypass_response_cache=True)
+    assert await runtime.generate_reply(bypass) == "answer 2"
+    with_skill = AgentRequest(session_id="s1", context=context, enabled_skills=("search",))
+    assert await runtime.generate_reply(with_skill) == "answer 3"
+    assert await runtime.generate_reply(request) == "answer 1"
+
+    runtime.clear_cached_replies("s1")
+    assert await runtime.generate_reply(request) == "answer 4"
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_response_cache_keys_on_history_and_skips_partial_replies() -> None:
+    from deepbot.memory.response_cache import ResponseCache
+
+    class CountingStreamingAgent:
+        def __init__(self) -> None:
+            self.calls = 0
+            self.stall = False
+
+        def __call__(self, _: str) -> str:
+            return "fallback"
+
+        async def stream_async(self, _: str):
+            self.calls += 1
+            yield {"data": f"answer {self.calls}"}
+            if self.stall:
+                await asyncio.sleep(0.2)
+
+    agent = CountingStreamingAgent()
+    runtime = AgentRuntime(
+        agent_callable=agent,
+        timeout_seconds=0.05,
+        response_cache=ResponseCache(ttl_seconds=60, similarity_threshold=0.9),
+    )
+    follow_up = {"role": "user", "content": "もっと詳しく"}
+
+    def _request(*history: str) -> AgentRequest:
+        turns = tuple({"role": "assistant", "content": text} for text in history)
+        return AgentRequest(session_id="s1", context=(*turns, follow_up))
+
+    assert await runtime.generate_reply(_request("about cats")) == "answer 1"
+    assert await runtime.generate_reply(_request("about cats")) == "answer 1"
+    assert await runtime.generate_reply(_request("about dogs")) == "answer 2"
+
+    agent.stall = True
+    partial = await runtime.generate_reply(_request("about birds"))
+    assert partial.startswith("answer 3") and "ここまでの結果" in partial
+    agent.stall = False
+    assert await runtime.generate_reply(_request("about birds")) == "answer 4"
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_runs_blocking_agent_on_dedicated_executor() -> None:
+    thread_names: list[str] = []
+
+    def agent(_: str) -> str:
+        thread_names.append(threading.current_thread().name)
+        return "ok"
+
+    runtime = AgentRuntime(agent_callable=agent, timeout_seconds=1)
+    assert await runtime.generate_reply(AgentRequest(session_id="s1", context=())) == "ok"
+    await runtime.aclose()
+    await runtime.aclose()
+
+    assert thread_names[0].startswith("deepbot-agent")
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_clears_agent_messages_between_calls() -> None:
+    class StatefulAgent:
+        def __init__(self) -> None:
+            self.messages: list[dict[str, str]] = []
+            self.seen: list[int] = []
+
+        def __call__(self, prompt: str) -> str:
+            self.seen.append(len(self.messages))
+            self.messages.extend([{"role": "user", "content": prompt}, {"role": "assistant", "content": "ok"}])
+            return "ok"
+
+    agent = StatefulAgent()
+    runtime = AgentRuntime(agent_callable=agent, timeout_seconds=1)
+
+    await runtime.generate_reply(AgentRequest(session_id="s1", context=({"role": "user", "content": "a"},)))
+    await runtime.generate_reply(AgentRequest(session_id="s2", context=({"role": "user", "content": "b"},)))
+
+    assert agent.seen == [0, 0]
+
+
+def test_extract_tool_helpers_accept_alternate_key_spellings() -> None:
+    event = {"current_tool_use": {"name": "  "}, "tool_use": {"toolName": " shell ", "toolUseId": "t1", "input": {"x": 1}}}
+
+    assert AgentRuntime._extract_tool_name(event) == "shell"
+    assert AgentRuntime._extract_tool_event(event) == {
+        "phase": "start",
+        "call_id": "t1",
+        "name": "shell",
+        "arguments": {"x": 1},
+    }
+    assert AgentRuntime._extract_tool_event({"tool_result": {"id": "t1", "content": "done"}}) == {
+        "phase": "end",
+        "call_id": "t1",
+        "name": None,
+        "output": "done",
+    }
+    assert AgentRuntime._extract_tool_event({"data": "text"}) is None
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_progress_updates_do_not_block_stream() -> None:
+    events_seen: list[str] = []
+    progress: list[str] = []
+
+    class StreamingAgent:
+        def __call__(self, _: str) -> str:
+            return "fallback"
+
+        async def stream_async(self, _: str):
+            for name in ("http_request", "calculator"):
+                events_seen.append(name)
+                yield {"current_tool_use": {"name": name}}
+            events_seen.append("done")
+            yield {"result": "final"}
+
+    async def slow_progress(text: str) -> None:
+        await asyncio.sleep(0.02)
+        # The stream has already moved past both tool events while the first update is in flight.
+        progress.append(f"{text}|{len(events_seen)}")
+
+    runtime = AgentRuntime(agent_callable=StreamingAgent(), timeout_seconds=1)
+    reply = await runtime.generate_reply(
+        AgentRequest(session_id="s1", context=(), progress_callback=slow_progress)
+    )
+
+    assert reply == "final"
+    assert [entry.split("|")[0] for entry in progress] == [
+        "調査を続けています…（http_request）",
+        "調査を続けています…（calculator）",
+    ]
+    assert progress[0].endswith("|3")
+
+
+@pytest.mark.asyncio
+async def test_agent_runtime_checks_out_one_pooled_agent_per_call() -> None:
+    class PooledAgent:
+        def __init__(self) -> None:
+            self.busy = False
+            self.calls = 0
+
+        def __call__(self, _: str) -> str:
+            assert not self.busy
+            self.busy = True
+            time.sleep(0.02)
+            self.calls += 1
+            self.busy = False
+            return "done"
+
+    first, second = PooledAgent(), PooledAgent()
+    runtime = AgentRuntime(
+        agent_callable=first,
+        agent_pool=(second,),
+        timeout_seconds=1,
+        max_concurrent_invocations=2,
+    )
+
+    await asyncio.gather(
+        *(runtime.generate_reply(AgentRequest(session_id=f"s{i}", context=())) for i in range(4))
+    )
+
+    assert first.calls == 2
+    assert second.calls == 2
+
+
+def test_agent_runtime_rejects_agent_pool_smaller_than_concurrency() -> None:
+    with pytest.raises(ConfigError, match="agent_pool provides 2 agents for 3"):
+        AgentRuntime(
+            agent_callable=lambda _: "a",
+            agent_pool=(lambda _: "b",),
+            timeout_seconds=1,
+            max_concurrent_invocations=3,
+        )
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import json
+from datetime import datetime, timezone
 
-from deepbot.audit_log import create_audit_logger
+from deepbot import audit_log
+from deepbot.audit_log import AuditLogger, create_audit_logger
 
 
-def _read_jsonl(path):
-    lines = path.read_text(encoding="utf-8").strip().splitlines()
+def _read_jsonl(logger):
+    logger.flush()
+    lines = logger.path.read_text(encoding="utf-8").strip().splitlines()
     return [json.loads(line) for line in lines]
 
 
@@ -16,7 +20,7 @@ def test_create_audit_logger_writes_session_meta(tmp_path, monkeypatch) -> None:
 
     logger = create_audit_logger()
     assert logger is not None
-    records = _read_jsonl(logger.path)
+    records = _read_jsonl(logger)
     assert records[0]["type"] == "session_meta"
     assert records[0]["payload"]["originator"] == "deepbot"
 
@@ -27,6 +31,36 @@ def test_create_audit_logger_returns_none_when_disabled(tmp_path, monkeypatch) -
     assert create_audit_logger() is None
 
 
+def test_now_iso_matches_datetime_millisecond_format(monkeypatch) -> None:
+    stamps = iter([1_760_000_000_123_456_789, 1_760_000_000_999_000_000, 1_760_000_001_000_500_000])
+    monkeypatch.setattr(audit_log.time, "time_ns", lambda: next(stamps))
+
+    for expected_ns in (1_760_000_000_123_456_789, 1_760_000_000_999_000_000, 1_760_000_001_000_500_000):
+        expected = (
+            datetime.fromtimestamp(expected_ns // 1000 / 1_000_000, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z")
+        )
+        assert audit_log._now_iso() == expected
+
+
+def test_audit_logger_close_drains_queue_and_rejects_later_writes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
+    logger = create_audit_logger()
+    assert logger is not None
+
+    for index in range(600):
+        logger.log_event(event="tick", session_id="s1", data={"index": index})
+    logger.close()
+    logger.close()
+    logger.log_event(event="after_close", session_id="s1")
+
+    records = _read_jsonl(logger)
+    assert len(records) == 601
+    assert [item["payload"]["index"] for item in records[1:]] == list(range(600))
+
+
 def test_audit_logger_appends_user_assistant_and_event(tmp_path, monkeypatch) -> None:
     monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
     monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
@@ -53,7 +87,7 @@ def test_audit_logger_appends_user_assistant_and_event(tmp_path, monkeypatch) ->
     )
     logger.log_event(event="agent_execution_failed", session_id="s1", data={"reason": "timeout"})
 
-    records = _read_jsonl(logger.path)
+    records = _read_jsonl(logger)
     assert [item["type"] for item in records] == [
         "session_meta",
         "response_item",
@@ -86,7 +120,7 @@ def test_audit_logger_appends_function_call_and_output(tmp_path, monkeypatch) ->
         tool_name="shell",
     )
 
-    records = _read_jsonl(logger.path)
+    records = _read_jsonl(logger)
     assert records[1]["payload"]["type"] == "function_call"
     assert records[1]["payload"]["call_id"] == "c1"
     assert records[2]["payload"]["type"] == "function_call_output"
@@ -117,10 +151,138 @@ def test_audit_logger_masks_auth_and_secret_fields(tmp_path, monkeypatch) -> Non
         call_id="c2",
     )
 
-    records = _read_jsonl(logger.path)
+    records = _read_jsonl(logger)
     user_text = records[1]["payload"]["content"][0]["text"]
     assert "/auth [REDACTED]" in user_text
     call_args = records[2]["payload"]["arguments"]
     assert "[REDACTED]" in call_args
     assert "abc123" not in call_args
     assert "raw-key" not in call_args
+
+
+def test_audit_logger_sanitize_text_skips_clean_text_and_keeps_pass_order() -> None:
+    clean = "hello, please summarize the token bucket algorithm"
+    assert AuditLogger._sanitize_text(clean) is clean
+    assert AuditLogger._sanitize_text("Bearer token=abc") == "Bearer [REDACTED]=[REDACTED]"
+    assert AuditLogger._sanitize_text("password: /auth hunter2") == "password=[REDACTED] [REDACTED]"
+    assert AuditLogger._sanitize_text("use api-key: xyz;") == "use api-key=[REDACTED];"
+    assert AuditLogger._sanitize_text("send BEARER xyz") == "send Bearer [REDACTED]"
+
+
+def test_audit_logger_sensitive_key_matches_token_substrings() -> None:
+    assert AuditLogger._is_sensitive_key("X-Api_Key")
+    assert AuditLogger._is_sensitive_key(" Authorization ")
+    assert AuditLogger._is_sensitive_key("refresh_token")
+    assert not AuditLogger._is_sensitive_key("headers")
+    assert not AuditLogger._is_sensitive_key("cmd")
+
+
+def test_audit_logger_sanitize_value_handles_nested_and_deep_payloads() -> None:
+    value = {"headers": {"Authorization": "Bearer abc"}, "items": ("token=x", [1, None, {"ok": "fine"}]), 2: "two"}
+    assert AuditLogger._sanitize_value(value) == {
+        "headers": {"Authorization": "[REDACTED]"},
+        "items": ["token=[REDACTED]", [1, None, {"ok": "fine"}]],
+        "2": "two",
+    }
+
+    deep: object = "leaf"
+    for _ in range(5000):
+        deep = [deep]
+    sanitized = AuditLogger._sanitize_value(deep)
+    for _ in range(5000):
+        sanitized = sanitized[0]
+    assert sanitized == "leaf"
+
+
+def test_audit_logger_sanitize_value_replaces_cycles_and_keeps_shared_values() -> None:
+    shared = {"ok": "fine"}
+    payload: dict[str, object] = {"a": shared, "b": [shared, shared]}
+    payload["self"] = payload
+    payload["b"].append(payload["b"])
+
+    assert AuditLogger._sanitize_value(payload) == {
+        "a": {"ok": "fine"},
+        "b": [{"ok": "fine"}, {"ok": "fine"}, "<cycle>"],
+        "self": "<cycle>",
+    }
+
+
+def test_audit_logger_finishes_short_writev(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
+    logger = create_audit_logger()
+    assert logger is not None
+    logger.flush()
+
+    real_writev = audit_log.os.writev
+    monkeypatch.setattr(audit_log.os, "writev", lambda fd, buffers: real_writev(fd, [buffers[0][:5]]))
+    logger.log_event(event="first", session_id="s1")
+    logger.log_event(event="second", session_id="s1")
+
+    records = _read_jsonl(logger)
+    assert [item["payload"].get("event") for item in records[1:]] == ["first", "second"]
+
+
+async def test_audit_logger_turn_buffers_records_per_task(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
+    logger = create_audit_logger()
+    assert logger is not None
+    logger.flush()
+    release = asyncio.Event()
+
+    async def _turn(session_id: str) -> None:
+        with logger.turn():
+            logger.log_event(event="start", session_id=session_id)
+            await release.wait()
+            logger.log_event(event="end", session_id=session_id)
+
+    first = asyncio.create_task(_turn("s1"))
+    second = asyncio.create_task(_turn("s2"))
+    await asyncio.sleep(0)
+    logger.flush()
+    assert len(_read_jsonl(logger)) == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+    records = _read_jsonl(logger)
+    assert [(item["payload"]["session_id"], item["payload"]["event"]) for item in records[1:]] == [
+        ("s1", "start"),
+        ("s1", "end"),
+        ("s2", "start"),
+        ("s2", "end"),
+    ]
+
+
+def test_audit_logger_turn_does_not_capture_other_loggers(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
+    first = create_audit_logger()
+    second = create_audit_logger()
+    assert first is not None and second is not None
+    assert first.path != second.path
+
+    with first.turn():
+        first.log_event(event="buffered", session_id="s1")
+        second.log_event(event="direct", session_id="s1")
+        assert len(_read_jsonl(first)) == 1
+        assert [item["payload"].get("event") for item in _read_jsonl(second)[1:]] == ["direct"]
+    assert [item["payload"].get("event") for item in _read_jsonl(first)[1:]] == ["buffered"]
+
+
+def test_audit_logger_bare_events_match_full_serialization(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT", "1")
+    monkeypatch.setenv("DEEPBOT_TRANSCRIPT_DIR", str(tmp_path))
+    logger = create_audit_logger()
+    assert logger is not None
+
+    logger.log_event(event="reset", session_id="s1")
+    logger.log_event(event="reset", session_id="s1", data={})
+    logger.log_event(event="reset", session_id="s1", data={"reason": "user"})
+
+    records = _read_jsonl(logger)
+    assert [item["payload"] for item in records[1:]] == [
+        {"event": "reset", "session_id": "s1"},
+        {"event": "reset", "session_id": "s1"},
+        {"event": "reset", "session_id": "s1", "reason": "user"},
+    ]
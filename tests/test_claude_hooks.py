@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 import json
+import os
+import sys
+import time
 from pathlib import Path
 
-from deepbot.agent.claude_hooks import ClaudeHooksManager
+import pytest
+
+from deepbot import fastjson
+from deepbot.agent import claude_hooks
+from deepbot.agent.claude_hooks import ClaudeHooksManager, _HookMatcher, _split_hook_command
 
 
 def _write_settings(path: Path, payload: dict) -> None:
@@ -110,3 +117,288 @@ def test_user_prompt_submit_collects_additional_context_from_stdout(tmp_path: Pa
 
     assert result.blocked is False
     assert "extra context from hook" in result.additional_context
+
+
+def test_matches_supports_wildcard_glob_regex_and_invalid_regex() -> None:
+    def _matcher(pattern: str) -> _HookMatcher:
+        return _HookMatcher(matcher=pattern, hooks=())
+
+    assert ClaudeHooksManager._matches(_matcher("*"), "Bash") is True
+    assert ClaudeHooksManager._matches(_matcher("mcp__*"), "mcp__github__search") is True
+    assert ClaudeHooksManager._matches(_matcher("Write|Edit"), "Edit") is True
+    assert ClaudeHooksManager._matches(_matcher("Write|Edit"), "Read") is False
+    assert ClaudeHooksManager._matches(_matcher("Bash("), "Bash(") is True
+    assert ClaudeHooksManager._matches(_matcher("Bash("), "Bash") is False
+
+
+def test_pre_tool_use_only_runs_matchers_for_target_tool(tmp_path: Path) -> None:
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {
+            "hooks": {
+                "PreToolUse": [
+                    {
+                        "matcher": "Read",
+                        "hooks": [
+                            {
+                                "type": "command",
+                                "command": "cat >/dev/null; echo 'no reads' >&2; exit 2",
+                            }
+                        ],
+                    }
+                ]
+            }
+        },
+    )
+
+    manager = ClaudeHooksManager.from_settings_paths(
+        (str(settings_path),),
+        timeout_ms=1000,
+        fail_mode="open",
+    )
+
+    for _ in range(2):
+        allowed = manager.dispatch_pre_tool_use(session_id="s1", tool_name="shell", tool_input={})
+        denied = manager.dispatch_pre_tool_use(session_id="s1", tool_name="file_read", tool_input={})
+        assert allowed.blocked is False
+        assert denied.blocked is True
+        assert "no reads" in denied.model_message
+
+
+def test_split_hook_command_only_bypasses_shell_for_plain_argv() -> None:
+    assert _split_hook_command("/usr/bin/hook --mode 'strict check'") == (
+        "/usr/bin/hook",
+        "--mode",
+        "strict check",
+    )
+    assert _split_hook_command("cat >/dev/null; exit 2") is None
+    assert _split_hook_command("echo $HOME") is None
+    assert _split_hook_command("FOO=1 hook") is None
+    assert _split_hook_command("exit 2") is None
+    assert _split_hook_command("time ./hook.sh") is None
+    assert _split_hook_command("wait") is None
+
+
+def test_plain_hook_command_runs_without_shell(tmp_path: Path) -> None:
+    script = tmp_path / "deny.py"
+    script.write_text(
+        "import json, sys\n"
+        "payload = json.load(sys.stdin)\n"
+        "print(json.dumps({'continue': False, 'stopReason': 'denied ' + payload['prompt']}))\n",
+        encoding="utf-8",
+    )
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {
+            "hooks": {
+                "UserPromptSubmit": [
+                    {"hooks": [{"type": "command", "command": f"{sys.executable} {script}"}]},
+                    {"hooks": [{"type": "command", "command": f"{tmp_path / 'missing-hook'}"}]},
+                ]
+            }
+        },
+    )
+
+    manager = ClaudeHooksManager.from_settings_paths(
+        (str(settings_path),),
+        timeout_ms=5000,
+        fail_mode="closed",
+    )
+
+    result = manager.dispatch_user_prompt_submit(session_id="s1", prompt="hello")
+
+    assert result.blocked is True
+    assert "denied hello" in result.user_message
+    assert "missing-hook" in result.user_message
+    assert "not found" in result.user_message
+
+
+def test_plain_hook_command_falls_back_to_shell_when_direct_exec_fails(tmp_path: Path) -> None:
+    manager = ClaudeHooksManager(matchers_by_event={}, timeout_ms=5000, fail_mode="closed", settings_files=())
+    no_shebang = tmp_path / "no-shebang.sh"
+    no_shebang.write_text("echo ran-by-sh\nexit 2\n", encoding="utf-8")
+    no_shebang.chmod(0o755)
+    not_executable = tmp_path / "not-executable.sh"
+    not_executable.write_text("#!/bin/sh\necho unreachable\n", encoding="utf-8")
+    not_executable.chmod(0o644)
+
+    script_run = manager._run_command(event_name="Stop", command=str(no_shebang), stdin_bytes=b"{}")
+    denied_run = manager._run_command(event_name="Stop", command=str(not_executable), stdin_bytes=b"{}")
+
+    assert (script_run.exit_code, script_run.stdout) == (2, "ran-by-sh")
+    assert denied_run.exit_code == 126
+    missing_run = manager._run_command(event_name="Stop", command=str(tmp_path / "missing"), stdin_bytes=b"{}")
+    assert missing_run.exit_code == 127
+    assert "unreachable" not in denied_run.stdout
+
+
+def test_hook_env_is_snapshotted_at_construction(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {
+            "hooks": {
+                "UserPromptSubmit": [
+                    {
+                        "hooks": [
+                            {
+                                "type": "command",
+                                "command": "cat >/dev/null; echo \"$CLAUDE_HOOK_EVENT_NAME:${DEEPBOT_HOOK_TEST:-unset}\"",
+                            }
+                        ]
+                    }
+                ]
+            }
+        },
+    )
+    monkeypatch.delenv("DEEPBOT_HOOK_TEST", raising=False)
+    manager = ClaudeHooksManager.from_settings_paths(
+        (str(settings_path),),
+        timeout_ms=1000,
+        fail_mode="open",
+    )
+    monkeypatch.setenv("DEEPBOT_HOOK_TEST", "fresh")
+
+    result = manager.dispatch_user_prompt_submit(session_id="s1", prompt="hello")
+
+    assert result.additional_context == "UserPromptSubmit:unset"
+
+
+def test_multiple_hooks_run_concurrently_and_keep_order(tmp_path: Path) -> None:
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {
+            "hooks": {
+                "UserPromptSubmit": [
+                    {"hooks": [{"type": "command", "command": "cat >/dev/null; sleep 0.4; echo first"}]},
+                    {"hooks": [{"type": "command", "command": "cat >/dev/null; sleep 0.4; echo second"}]},
+                    {"hooks": [{"type": "command", "command": "cat >/dev/null; echo third"}]},
+                ]
+            }
+        },
+    )
+    manager = ClaudeHooksManager.from_settings_paths(
+        (str(settings_path),),
+        timeout_ms=5000,
+        fail_mode="open",
+    )
+
+    started = time.monotonic()
+    result = manager.dispatch_user_prompt_submit(session_id="s1", prompt="hello")
+    elapsed = time.monotonic() - started
+
+    assert result.additional_context == "first\nsecond\nthird"
+    assert elapsed < 0.75
+
+
+def test_parse_json_decision_skips_plain_text_and_accepts_padded_json() -> None:
+    assert ClaudeHooksManager._parse_json_decision(b"") is None
+    assert ClaudeHooksManager._parse_json_decision(b"  plain log output {\"continue\": false}") is None
+    assert ClaudeHooksManager._parse_json_decision(b"{not json") is None
+    assert ClaudeHooksManager._parse_json_decision(b'{"stopReason": "\xff"}') is None
+    assert ClaudeHooksManager._parse_json_decision(b'\x0c{"continue": false}\x0b').continue_run is False
+
+    decision = ClaudeHooksManager._parse_json_decision(b'\n  {"continue": false, "stopReason": " stop "}\n')
+
+    assert decision is not None
+    assert decision.continue_run is False
+    assert decision.stop_reason == "stop"
+
+
+def test_hook_payload_cwd_is_captured_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    manager = ClaudeHooksManager(
+        matchers_by_event={},
+        timeout_ms=1000,
+        fail_mode="open",
+        settings_files=(),
+    )
+    first = manager._cached_cwd()
+    monkeypatch.chdir(tmp_path)
+
+    assert manager._cached_cwd() == first
+
+
+def test_settings_file_is_reparsed_only_when_changed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {"hooks": {"Stop": [{"hooks": [{"type": "command", "command": "true"}]}]}},
+    )
+    ClaudeHooksManager.from_settings_paths((str(settings_path),), timeout_ms=1000, fail_mode="open")
+
+    calls: list[bytes] = []
+    original_loads = claude_hooks.fastjson.loads
+
+    def _counting_loads(data):
+        calls.append(data)
+        return original_loads(data)
+
+    monkeypatch.setattr(claude_hooks.fastjson, "loads", _counting_loads)
+
+    cached = ClaudeHooksManager.from_settings_paths((str(settings_path),), timeout_ms=1000, fail_mode="open")
+    assert calls == []
+    assert cached.has_any_hooks() is True
+
+    _write_settings(settings_path, {"hooks": {}})
+    stat_result = settings_path.stat()
+    os.utime(settings_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+    reloaded = ClaudeHooksManager.from_settings_paths((str(settings_path),), timeout_ms=1000, fail_mode="open")
+
+    assert len(calls) == 1
+    assert reloaded.has_any_hooks() is False
+    assert reloaded.loaded_files == (str(settings_path),)
+
+
+def test_hook_receives_event_payload_on_stdin(tmp_path: Path) -> None:
+    capture_path = tmp_path / "payload.json"
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {
+            "hooks": {
+                "Stop": [{"hooks": [{"type": "command", "command": f"cat > '{capture_path}'"}]}],
+            }
+        },
+    )
+    manager = ClaudeHooksManager.from_settings_paths(
+        (str(settings_path),),
+        timeout_ms=1000,
+        fail_mode="open",
+    )
+
+    manager.dispatch_stop(session_id="s1", response_text="done")
+    manager.dispatch_stop(session_id="s2", response_text="again")
+
+    payload = json.loads(capture_path.read_text(encoding="utf-8"))
+    assert list(payload) == ["session_id", "cwd", "hook_event_name", "stop_hook_active", "response"]
+    assert payload["session_id"] == "s2"
+    assert payload["hook_event_name"] == "Stop"
+    assert payload["stop_hook_active"] is True
+    assert payload["response"] == "again"
+
+
+def test_unserializable_tool_input_follows_fail_mode(tmp_path: Path) -> None:
+    settings_path = tmp_path / ".claude" / "settings.json"
+    _write_settings(
+        settings_path,
+        {"hooks": {"PreToolUse": [{"matcher": "*", "hooks": [{"type": "command", "command": "true"}]}]}},
+    )
+
+    for fail_mode, expected_blocked in (("open", False), ("closed", True)):
+        manager = ClaudeHooksManager.from_settings_paths(
+            (str(settings_path),),
+            timeout_ms=1000,
+            fail_mode=fail_mode,
+        )
+        result = manager.dispatch_pre_tool_use(session_id="s1", tool_name="shell", tool_input={"obj": object()})
+        assert result.blocked is expected_blocked
+
+
+def test_parse_json_decision_ignores_non_utf8_output_without_orjson(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fastjson, "orjson", None)
+
+    assert ClaudeHooksManager._parse_json_decision(b'{"stopReason": "\xff"}') is None
+    assert ClaudeHooksManager._parse_json_decision(b'\x0c{"continue": false}').continue_run is False
@@ -3,7 +3,8 @@ from __future__ import annotations
 import json
 import subprocess
 import sys
-from types import ModuleType
+from collections.abc import Iterator
+from types import ModuleType, SimpleNamespace
 
 import pytest
 
@@ -11,13 +12,17 @@ from deepbot.agent.claude_subagent_tool import (
     ClaudeSubagentSettings,
     build_claude_subagent_tool,
 )
+from deepbot.agent.strands_tool import get_strands_tool
 
 
 @pytest.fixture(autouse=True)
-def _fake_strands_tool(monkeypatch: pytest.MonkeyPatch) -> None:
+def _fake_strands_tool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
     fake_strands = ModuleType("strands")
     fake_strands.tool = lambda fn: fn
     monkeypatch.setitem(sys.modules, "strands", fake_strands)
+    get_strands_tool.cache_clear()
+    yield
+    get_strands_tool.cache_clear()
 
 
 def test_claude_subagent_builds_expected_command(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -37,8 +42,8 @@ def test_claude_subagent_builds_expected_command(monkeypatch: pytest.MonkeyPatch
                     "total_cost_usd": 0.01,
                     "is_error": False,
                 }
-            ),
-            stderr="",
+            ).encode("utf-8"),
+            stderr=b"",
         )
 
     monkeypatch.setattr(subprocess, "run", _fake_run)
@@ -79,8 +84,8 @@ def test_claude_subagent_raises_on_non_json_output(monkeypatch: pytest.MonkeyPat
         return subprocess.CompletedProcess(
             args=args[0],
             returncode=0,
-            stdout="not-json",
-            stderr="",
+            stdout=b"not-json",
+            stderr=b"",
         )
 
     monkeypatch.setattr(subprocess, "run", _fake_run)
@@ -102,27 +107,63 @@ def test_claude_subagent_raises_on_non_json_output(monkeypatch: pytest.MonkeyPat
         tool(task="hello")
 
 
-def test_claude_subagent_sidecar_mode(monkeypatch: pytest.MonkeyPatch) -> None:
-    class _Resp:
-        def __init__(self, payload: dict[str, object]) -> None:
-            self._body = json.dumps(payload).encode("utf-8")
+def test_claude_subagent_reports_stderr_on_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _fake_run(*args, **kwargs):
+        assert "text" not in kwargs
+        return subprocess.CompletedProcess(
+            args=args[0],
+            returncode=1,
+            stdout=b"",
+            stderr="認証エラー\n".encode("utf-8"),
+        )
+
+    monkeypatch.setattr(subprocess, "run", _fake_run)
+
+    tool = build_claude_subagent_tool(
+        ClaudeSubagentSettings(
+            command="claude",
+            workdir="/workspace/bot-rw",
+            timeout_seconds=30,
+            model=None,
+            skip_permissions=False,
+            transport="direct",
+            sidecar_url="http://claude-runner:8787/v1/run",
+            sidecar_token="",
+        )
+    )
 
-        def read(self) -> bytes:
-            return self._body
+    with pytest.raises(RuntimeError, match="exit code 1: 認証エラー$"):
+        tool(task="hello")
 
-        def __enter__(self) -> "_Resp":
-            return self
 
-        def __exit__(self, exc_type, exc, tb) -> None:
-            return None
+class _FakePool:
+    def __init__(self, status: int, body: bytes) -> None:
+        self._status = status
+        self._body = body
+        self.captured: dict[str, object] = {}
 
-    captured: dict[str, object] = {}
+    def request(self, method, url, *, body, headers, timeout):
+        self.captured.update(method=method, url=url, auth=headers.get("Authorization"), timeout=timeout)
+        return SimpleNamespace(status=self._status, data=self._body)
 
-    def _fake_urlopen(req, timeout):
-        captured["url"] = req.full_url
-        captured["auth"] = req.headers.get("Authorization")
-        captured["timeout"] = timeout
-        return _Resp(
+
+def _sidecar_settings(token: str = "") -> ClaudeSubagentSettings:
+    return ClaudeSubagentSettings(
+        command="claude",
+        workdir="/workspace/bot-rw",
+        timeout_seconds=30,
+        model="sonnet",
+        skip_permissions=False,
+        transport="sidecar",
+        sidecar_url="http://claude-runner:8787/v1/run",
+        sidecar_token=token,
+    )
+
+
+def test_claude_subagent_sidecar_mode(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = _FakePool(
+        200,
+        json.dumps(
             {
                 "result": "ok-from-sidecar",
                 "session_id": "s-sidecar",
@@ -130,25 +171,26 @@ def test_claude_subagent_sidecar_mode(monkeypatch: pytest.MonkeyPatch) -> None:
                 "total_cost_usd": 0.0,
                 "is_error": False,
             }
-        )
-
-    monkeypatch.setattr("deepbot.agent.claude_subagent_tool.urlrequest.urlopen", _fake_urlopen)
-
-    tool = build_claude_subagent_tool(
-        ClaudeSubagentSettings(
-            command="claude",
-            workdir="/workspace/bot-rw",
-            timeout_seconds=30,
-            model="sonnet",
-            skip_permissions=False,
-            transport="sidecar",
-            sidecar_url="http://claude-runner:8787/v1/run",
-            sidecar_token="secret-token",
-        )
+        ).encode("utf-8"),
     )
+    monkeypatch.setattr("deepbot.agent.claude_subagent_tool._SIDECAR_POOL", pool)
+
+    tool = build_claude_subagent_tool(_sidecar_settings(token="secret-token"))
     result = tool(task="do task", resume_session_id="session-1")
     payload = json.loads(result["content"][0]["text"])
 
-    assert captured["url"] == "http://claude-runner:8787/v1/run"
-    assert captured["auth"] == "Bearer secret-token"
+    assert pool.captured["method"] == "POST"
+    assert pool.captured["url"] == "http://claude-runner:8787/v1/run"
+    assert pool.captured["auth"] == "Bearer secret-token"
+    assert pool.captured["timeout"] == 35
     assert payload["result"] == "ok-from-sidecar"
+
+
+def test_claude_subagent_sidecar_http_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = _FakePool(503, b"runner busy")
+    monkeypatch.setattr("deepbot.agent.claude_subagent_tool._SIDECAR_POOL", pool)
+
+    tool = build_claude_subagent_tool(_sidecar_settings())
+
+    with pytest.raises(RuntimeError, match="sidecar HTTP 503: runner busy"):
+        tool(task="do task")
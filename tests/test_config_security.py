@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import dotenv
 import pytest
 
+from deepbot import config as config_module
 from deepbot.config import ConfigError, load_config
 
 
 def _set_base_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DEEPBOT_SKIP_DOTENV", "1")
     monkeypatch.setenv("DISCORD_BOT_TOKEN", "token")
     monkeypatch.setenv("STRANDS_MODEL_PROVIDER", "")
     monkeypatch.setenv("STRANDS_MODEL_CONFIG", "{}")
@@ -100,6 +103,34 @@ def test_config_allows_openai_provider_without_key_when_base_url_set(
     config = load_config()
     assert config.strands_model_provider == "openai"
     assert config.openai_base_url == "http://litellm:4000/v1"
+    assert config.strands_model_config["client_args"] == {"base_url": "http://litellm:4000/v1"}
+
+
+def test_config_keeps_explicit_openai_client_base_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("STRANDS_MODEL_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://litellm:4000/v1")
+    monkeypatch.setenv("OPENAI_MODEL_ID", "gpt-4o-mini")
+    monkeypatch.setenv(
+        "STRANDS_MODEL_CONFIG",
+        '{"client_args": {"base_url": "http://proxy:8000/v1", "timeout": 30}}',
+    )
+
+    config = load_config()
+    assert config.strands_model_config["client_args"] == {"base_url": "http://proxy:8000/v1", "timeout": 30}
+
+
+def test_config_rejects_non_object_openai_client_args(monkeypatch: pytest.MonkeyPatch) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("STRANDS_MODEL_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://litellm:4000/v1")
+    monkeypatch.setenv("OPENAI_MODEL_ID", "gpt-4o-mini")
+    monkeypatch.setenv("STRANDS_MODEL_CONFIG", '{"client_args": "oops"}')
+
+    with pytest.raises(ConfigError, match="client_args must be an object"):
+        load_config()
 
 
 def test_config_rejects_openai_provider_without_key_and_without_base_url(
@@ -278,3 +309,111 @@ def test_config_parses_security_settings(monkeypatch: pytest.MonkeyPatch) -> Non
     assert config.security_alert_channel_id == "123456"
     assert config.security_alert_bind_port == 8088
     assert config.security_port_monitor_exclude_ports == (22, 8080)
+
+
+def test_config_rejects_non_positive_agent_concurrency(monkeypatch: pytest.MonkeyPatch) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("AGENT_MAX_CONCURRENT_INVOCATIONS", "0")
+
+    with pytest.raises(ConfigError, match="AGENT_MAX_CONCURRENT_INVOCATIONS"):
+        load_config()
+
+
+def test_config_loads_dotenv_once_on_first_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("DEEPBOT_SKIP_DOTENV", "0")
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    calls: list[bool] = []
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda override: calls.append(override))
+    config_module._load_dotenv_once.cache_clear()
+    try:
+        load_config()
+        load_config()
+    finally:
+        config_module._load_dotenv_once.cache_clear()
+
+    assert calls == [True]
+
+
+def test_config_reads_model_config_from_file_and_rejects_invalid_json(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    model_config_path = tmp_path / "model.json"
+    model_config_path.write_text('{"model_id": "from-file"}', encoding="utf-8")
+    monkeypatch.setenv("STRANDS_MODEL_CONFIG", f"  {model_config_path}  ")
+
+    assert load_config().strands_model_config["model_id"] == "from-file"
+
+    monkeypatch.setenv("STRANDS_MODEL_CONFIG", str(tmp_path / "missing.json"))
+    with pytest.raises(ConfigError, match="STRANDS_MODEL_CONFIG"):
+        load_config()
+
+
+@pytest.mark.parametrize(("value", "message"), [("0", "must be > 0"), ("ten", "must be an integer")])
+def test_config_rejects_invalid_positive_int_settings(
+    monkeypatch: pytest.MonkeyPatch, value: str, message: str
+) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("CRON_POLL_SECONDS", value)
+
+    with pytest.raises(ConfigError, match=f"CRON_POLL_SECONDS {message}"):
+        load_config()
+
+
+def test_config_keeps_path_setting_case(monkeypatch: pytest.MonkeyPatch) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("TOOL_WRITE_ROOTS", "/workspace/Data")
+    monkeypatch.setenv("SHELL_DENY_PATH_PREFIXES", "/root/.SSH, /app/.env")
+    monkeypatch.setenv("ENABLED_DANGEROUS_TOOLS", "Shell,FILE_READ")
+
+    config = load_config()
+    assert config.tool_write_roots == ("/workspace/Data",)
+    assert config.tool_read_roots == ("/workspace/Data", "/app/config/skills")
+    assert config.shell_deny_path_prefixes == ("/root/.SSH", "/app/.env")
+    assert config.enabled_dangerous_tools == ("shell", "file_read")
+
+
+@pytest.mark.parametrize(
+    ("warn", "block", "message"),
+    [
+        ("1.5", "0.95", "DEFENDER_WARN_THRESHOLD must be between 0 and 1"),
+        ("nan", "0.95", "DEFENDER_WARN_THRESHOLD must be between 0 and 1"),
+        ("0.35", "high", "DEFENDER_BLOCK_THRESHOLD must be a number"),
+        ("0.9", "0.5", "DEFENDER_WARN_THRESHOLD must be <= DEFENDER_BLOCK_THRESHOLD"),
+    ],
+)
+def test_config_rejects_invalid_defender_thresholds(
+    monkeypatch: pytest.MonkeyPatch, warn: str, block: str, message: str
+) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv("DEFENDER_WARN_THRESHOLD", warn)
+    monkeypatch.setenv("DEFENDER_BLOCK_THRESHOLD", block)
+
+    with pytest.raises(ConfigError, match=message):
+        load_config()
+
+
+@pytest.mark.parametrize(
+    ("name", "value", "message"),
+    [
+        ("RESPONSE_CACHE_TTL_SECONDS", "-1", "RESPONSE_CACHE_TTL_SECONDS must be >= 0"),
+        ("RESPONSE_CACHE_TTL_SECONDS", "1m", "RESPONSE_CACHE_TTL_SECONDS must be an integer"),
+        ("RESPONSE_CACHE_SIMILARITY", "0", r"RESPONSE_CACHE_SIMILARITY must be within \(0, 1\]"),
+        ("RESPONSE_CACHE_SIMILARITY", "high", "RESPONSE_CACHE_SIMILARITY must be a number"),
+    ],
+)
+def test_config_rejects_invalid_response_cache_settings(
+    monkeypatch: pytest.MonkeyPatch, name: str, value: str, message: str
+) -> None:
+    _set_base_env(monkeypatch)
+    monkeypatch.setenv("AUTH_REQUIRED", "false")
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ConfigError, match=message):
+        load_config()
@@ -200,6 +200,8 @@ async def test_processing_message_sent_for_search_like_input() -> None:
 async def test_reset_command_clears_context() -> None:
     store = SessionStore(max_messages=10, ttl_seconds=300)
     runtime = DummyRuntime()
+    cleared: list[str] = []
+    runtime.clear_cached_replies = cleared.append
     processor = MessageProcessor(
         store=store,
         runtime=runtime,
@@ -239,6 +241,7 @@ async def test_reset_command_clears_context() -> None:
     )
 
     assert await store.get_context("guild:g1:channel:c1:user:u1") == []
+    assert cleared == ["guild:g1:channel:c1:user:u1"]
 
 
 @pytest.mark.asyncio
@@ -1895,3 +1898,28 @@ async def test_maybe_start_auto_thread_returns_created_thread() -> None:
         )
         is False
     )
+
+
+@pytest.mark.parametrize(
+    ("filename", "content_type", "expected"),
+    [
+        ("photo.bin", "image/jpg", "jpeg"),
+        ("photo.bin", "image/webp; charset=binary", "webp"),
+        ("photo.JPG", None, "jpeg"),
+        ("photo.png", "application/octet-stream", "png"),
+        ("notes.txt", "text/plain", None),
+    ],
+)
+def test_detect_image_format_maps_content_type_and_suffix(
+    filename: str,
+    content_type: str | None,
+    expected: str | None,
+) -> None:
+    attachment = AttachmentEnvelope(
+        filename=filename,
+        url="https://cdn.discordapp.com/x",
+        content_type=content_type,
+        size=10,
+    )
+
+    assert MessageProcessor._detect_image_format(attachment) == expected
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+from deepbot import fastjson
+
+
+def test_dumps_returns_compact_utf8_bytes() -> None:
+    payload = {"text": "こんにちは", "n": 1}
+
+    encoded = fastjson.dumps(payload)
+
+    assert isinstance(encoded, bytes)
+    assert fastjson.loads(encoded) == payload
+    assert "こんにちは".encode("utf-8") in encoded
+
+
+def test_dumps_falls_back_for_values_orjson_rejects() -> None:
+    big = 1 << 70
+
+    assert fastjson.dumps({"big": big}) == f'{{"big":{big}}}'.encode("utf-8")
+
+
+def test_loads_raises_stdlib_decode_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(fastjson.JSONDecodeError):
+        fastjson.loads(b"not-json")
+
+    monkeypatch.setattr(fastjson, "orjson", None)
+    with pytest.raises(fastjson.JSONDecodeError):
+        fastjson.loads("not-json")
+    assert fastjson.dumps_str({"a": [1, 2]}) == '{"a":[1,2]}'
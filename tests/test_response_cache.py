@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+from deepbot.memory.response_cache import ResponseCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_response_cache_hits_on_normalized_duplicate() -> None:
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.9, time_fn=FakeClock())
+    cache.store("s1", "What is  the  weather in Tokyo?", "sunny")
+
+    assert cache.lookup("s1", "what is the weather in tokyo?") == "sunny"
+    assert normalize_query("ＡＢＣ\n  def") == "abc def"
+
+
+def test_response_cache_uses_similarity_threshold() -> None:
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.8, time_fn=FakeClock())
+    cache.store("s1", "how do I reset my discord password", "use settings")
+
+    assert cache.lookup("s1", "how do I reset my discord password?") == "use settings"
+    assert cache.lookup("s1", "how do I delete my discord account") is None
+
+
+def test_response_cache_is_scoped_per_session() -> None:
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.9, time_fn=FakeClock())
+    cache.store("s1", "hello there", "hi")
+
+    assert cache.lookup("s2", "hello there") is None
+
+
+def test_response_cache_is_scoped_per_key() -> None:
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.9, time_fn=FakeClock())
+    cache.store("s1", "hello there", "hi", scope=(("search",), (), ()))
+
+    assert cache.lookup("s1", "hello there") is None
+    assert cache.lookup("s1", "hello there", scope=(("search",), (), ())) == "hi"
+
+
+def test_response_cache_expires_entries_by_ttl() -> None:
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.9, time_fn=clock)
+    cache.store("s1", "hello there", "hi")
+    clock.now = 61.0
+
+    assert cache.lookup("s1", "hello there") is None
+
+
+def test_response_cache_rejects_invalid_threshold() -> None:
+    with pytest.raises(ValueError, match="similarity_threshold"):
+        ResponseCache(ttl_seconds=60, similarity_threshold=0.0)
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from types import SimpleNamespace
+
 import pytest
 
 from deepbot.agent.runtime import (
     _build_guarded_file_read_tool,
+    _build_guarded_file_write_tool,
     _is_path_allowed,
+    _load_default_tools,
+    _references_denied_prefix,
     _validate_shell_command_with_srt,
 )
+from deepbot.agent.strands_tool import get_strands_tool
+from deepbot.config import ConfigError
+
+
+@pytest.fixture(autouse=True)
+def _fresh_strands_tool() -> Iterator[None]:
+    # The decorator cache is shared with claude_subagent_tool, whose tests install a fake strands.
+    get_strands_tool.cache_clear()
+    yield
+    get_strands_tool.cache_clear()
 
 
 def test_shell_command_validator_accepts_srt_wrapped_command() -> None:
@@ -56,3 +72,70 @@ def test_guarded_file_read_rejects_path_outside_roots(tmp_path) -> None:
     guarded = _build_guarded_file_read_tool(allowed_roots=(str(tmp_path / "allowed"),))
     with pytest.raises(ValueError, match="file_read rejected"):
         guarded(path=str(tmp_path / "blocked.txt"))
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("cat /app/config/x.json", True),
+        ("ls /workspace/app", False),
+        ("ls /app", True),
+        ("ls /appdata", False),
+        ("cat /etc/passwd", True),
+        ("echo hello", False),
+    ],
+)
+def test_references_denied_prefix_matches_any_prefix(text: str, expected: bool) -> None:
+    assert _references_denied_prefix(text, ("/app", "/etc")) is expected
+    assert _references_denied_prefix(text, ()) is False
+
+
+def test_references_denied_prefix_agrees_with_per_prefix_scan() -> None:
+    import re
+
+    prefixes = ("/etc", "/usr", "/usr/local/bin", "/var/lib", "/var", "/root", "/proc", "/sys", "/app/config", "")
+    samples = [
+        "cat /usr/local/bin/tool",
+        "ls /usr/localx",
+        "ls /varnish",
+        "echo /var",
+        "cat /root/.ssh/id_rsa",
+        "echo x/etc/passwd",
+        "python /workspace/a.py",
+        "ls /proc/1",
+        "cat /sys",
+        "ls /app/configs",
+        "ls /",
+        "echo plain",
+    ]
+    for subset in (prefixes[:-1], prefixes):
+        for text in samples:
+            expected = any(
+                re.search(rf"(^|[^A-Za-z0-9_])({re.escape(prefix)})(/|$)", text) for prefix in subset
+            )
+            assert _references_denied_prefix(text, subset) is expected, (subset, text)
+
+
+def test_guarded_file_write_reports_utf8_byte_count(tmp_path) -> None:
+    allowed = tmp_path / "allowed"
+    guarded = _build_guarded_file_write_tool(allowed_roots=(str(allowed),))
+
+    result = guarded(path=str(allowed / "sub" / "note.md"), content="こんにちは\n")
+
+    assert (allowed / "sub" / "note.md").read_text(encoding="utf-8") == "こんにちは\n"
+    assert result["content"][0]["text"].startswith("Wrote 16 bytes to ")
+
+
+def test_load_default_tools_propagates_mcp_config_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _raise_config_error() -> list[object]:
+        raise ConfigError("MCP_SERVERS_JSON must be a JSON object")
+
+    monkeypatch.setattr("deepbot.mcp_tools.load_mcp_tool_providers", _raise_config_error)
+    config = SimpleNamespace(
+        enabled_dangerous_tools=(),
+        dangerous_tools_enabled=False,
+        claude_subagent_enabled=False,
+    )
+
+    with pytest.raises(ConfigError, match="MCP_SERVERS_JSON"):
+        _load_default_tools(config)
@@ -22,6 +22,9 @@ def _make_config() -> AppConfig:
         auto_thread_archive_minutes=1440,
         auto_thread_rename_from_reply=True,
         agent_timeout_seconds=45,
+        agent_max_concurrent_invocations=1,
+        response_cache_ttl_seconds=0,
+        response_cache_similarity=0.9,
         bot_fallback_message="fallback",
         bot_processing_message="processing",
         log_level="INFO",
@@ -4,7 +4,11 @@ from pathlib import Path
 
 from deepbot.skills import (
     build_selected_skill_prompt,
+    clear_skills_cache,
     extract_selected_skill,
+    get_cached_skills,
+    get_skill_extractor,
+    get_skills_discovery_prompt,
     list_skills,
 )
 
@@ -79,3 +83,45 @@ def test_extract_selected_skill_with_mention_prefix(monkeypatch, tmp_path: Path)
     assert selected is not None
     assert selected.name == "agent-memory"
     assert cleaned == "検索して"
+
+
+def test_get_cached_skills_reuses_scan_until_directory_changes(monkeypatch, tmp_path: Path) -> None:
+    config_dir = tmp_path / "config"
+    skills_dir = config_dir / "skills"
+    _write_skill(skills_dir, "writer", "write better text")
+    monkeypatch.setenv("DEEPBOT_CONFIG_DIR", str(config_dir))
+    clear_skills_cache()
+
+    first = get_cached_skills()
+    (skills_dir / "writer" / "SKILL.md").write_text(
+        "---\nname: writer\ndescription: edited\n---\n",
+        encoding="utf-8",
+    )
+    assert get_cached_skills() is first
+
+    _write_skill(skills_dir, "reviewer", "review docs")
+    refreshed = get_cached_skills()
+
+    assert [s.name for s in refreshed] == ["reviewer", "writer"]
+    assert get_skills_discovery_prompt(refreshed) == get_skills_discovery_prompt(refreshed)
+    assert "- writer: edited" in (get_skills_discovery_prompt(refreshed) or "")
+
+
+def test_get_skill_extractor_is_shared_per_skill_set(monkeypatch, tmp_path: Path) -> None:
+    config_dir = tmp_path / "config"
+    skills_dir = config_dir / "skills"
+    _write_skill(skills_dir, "writer", "write better text")
+    _write_skill(skills_dir, "reviewer", "review docs")
+
+    monkeypatch.setenv("DEEPBOT_CONFIG_DIR", str(config_dir))
+    skills = tuple(list_skills())
+
+    extractor = get_skill_extractor(skills)
+    assert get_skill_extractor(skills) is extractor
+
+    selected, cleaned = extractor.extract("/reviewer check this")
+    assert selected is not None
+    assert selected.name == "reviewer"
+    assert cleaned == "check this"
+    assert extractor.extract("/unknown hi") == (None, "/unknown hi")
+    assert get_skill_extractor(()).extract("/writer hi") == (None, "/writer hi")